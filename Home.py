@@ -1,16 +1,15 @@
 import streamlit as st
-import sqlite3
-import time
-from utils.expenseTracker import ExpenseManager
-from utils.expenseTracker import IncomeManager
-from utils.expenseTracker import Account
-from auth import AuthManager
+from auth import get_auth_manager
+from utils.finbot import start_model_warmup
 
 
 st.title("FinTrack")
 st.write("An AI powered finance tracker.")
 
-auth = AuthManager()
+auth = get_auth_manager()
+
+# Start loading the FinBot model while the user logs in
+start_model_warmup()
 
 if "logged_in" not in st.session_state:
     st.session_state.logged_in = False
@@ -22,20 +21,37 @@ with tab1:
     st.subheader("Login")
     email = st.text_input("Email", key="login_email")
     password = st.text_input("Password", type="password", key="login_password")
-    login_btn = st.button("Login", key="login_btn")
+    # A submitted check runs on the auth pool; this script returns while it hashes
+    pending = st.session_state.get("login_future")
+    login_btn = st.button("Login", key="login_btn", disabled=pending is not None)
 
     if login_btn:
         if email.strip() and password.strip():
-            if auth.login_user(email, password):
+            st.session_state.login_future = auth.login_user_async(email, password)
+            st.session_state.login_pending_email = email
+            st.rerun()
+        else:
+            st.error("Please enter both email and password.")
+
+    if pending is not None:
+        if pending.done():
+            del st.session_state.login_future
+            if pending.result():
                 st.session_state.logged_in = True
-                st.session_state.user_email = email
-                st.success("Login successful! Redirecting...")
-                time.sleep(1.5)
+                st.session_state.user_email = st.session_state.pop("login_pending_email")
+                st.toast("Login successful!")
                 st.rerun()
             else:
                 st.error("Invalid email or password.")
         else:
-            st.error("Please enter both email and password.")
+            # Only this block reruns until the check finishes, then the page handles the result
+            @st.fragment(run_every=0.5)
+            def poll_login():
+                if pending.done():
+                    st.rerun()
+                st.info("Checking credentials...")
+
+            poll_login()
 
 with tab2:
     st.subheader("Register")
@@ -61,19 +77,5 @@ if st.session_state.logged_in:
     if st.button("Logout", key="logout_btn"):
         st.session_state.logged_in = False
         st.session_state.user_email = ""
-        st.success("Logged out successfully!")
-        time.sleep(1)
+        st.toast("Logged out successfully!")
         st.rerun()
-
-
-db_name = "expenses.db"
-
-conn = sqlite3.connect(db_name)
-c = conn.cursor()
-
-if st.session_state.logged_in:
-    ExManager = ExpenseManager(db_name=db_name)
-    InManager = IncomeManager(db_name=db_name)
-    account = Account(db_name=db_name)
-
-conn.close()
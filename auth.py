@@ -1,31 +1,98 @@
+import hmac
+import os
 import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
 import streamlit as st
-import hashlib
+from utils.cache import LRUCache
+from utils.database import get_database
+from utils.passwords import PasswordHasher
+from utils.storage import USERS_SCHEMA, users_db_name
+
+# Password hashing is deliberately CPU-heavy. Every hash runs on this shared
+# pool, which caps how many run at once across all sessions, so a burst of
+# logins queues instead of saturating every core. The login page keeps the
+# future from login_user_async and polls it, so no script thread waits on a hash.
+AUTH_WORKERS = int(os.environ.get("FINTRACK_AUTH_WORKERS", min(4, os.cpu_count() or 1)))
+_executor = ThreadPoolExecutor(max_workers=AUTH_WORKERS, thread_name_prefix="auth")
+
+# Per-process key: the verify cache holds HMACs of passwords, never the passwords
+_CACHE_KEY = os.urandom(32)
+
 
 class AuthManager:
-    def __init__(self, db_name="users.db"):
-        self.conn = sqlite3.connect(db_name)
+    def __init__(self, db_name=None, hasher=None, verify_cache_size=256):
+        # users.db, or the consolidated database in shared storage mode
+        self.db = get_database(db_name or users_db_name())
+        self.conn = self.db.conn
         self.cursor = self.conn.cursor()
+        self.hasher = hasher or PasswordHasher()
+        # Successful (email, stored hash, password) checks, so reruns skip the KDF
+        self.verify_cache = LRUCache(verify_cache_size) if verify_cache_size else None
         
-        self.cursor.execute('''CREATE TABLE IF NOT EXISTS users (
-                                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                                email TEXT UNIQUE,
-                                password TEXT)''')
-        self.conn.commit()
+        self.db.ensure_schema("users", USERS_SCHEMA)
 
     def hash_password(self, password):
-        return hashlib.sha256(password.encode()).hexdigest()
+        return self.hasher.hash(password)
 
     def register_user(self, email, password):
+        hashed_pw = _executor.submit(self.hash_password, password).result()
         try:
-            hashed_pw = self.hash_password(password)
-            self.cursor.execute("INSERT INTO users (email, password) VALUES (?, ?)", (email, hashed_pw))
-            self.conn.commit()
+            with self.db.transaction():
+                self.cursor.execute("INSERT INTO users (email, password) VALUES (?, ?)", (email, hashed_pw))
             return True
         except sqlite3.IntegrityError:
-            return False 
+            return False
+
+    def _verify(self, email, password):
+        with self.db.reading() as conn:
+            row = conn.execute("SELECT password FROM users WHERE email=?", (email,)).fetchone()
+        if row is None:
+            # Do the same work as a real check so response time does not reveal registered emails
+            self.hasher.hash(password)
+            return False
+
+        stored = row[0]
+        token = hmac.new(_CACHE_KEY, password.encode(), "sha256").digest()
+        if self.verify_cache is not None and self.verify_cache.get((email, stored, token)):
+            return True
+        if not self.hasher.verify(password, stored):
+            return False
+
+        # Upgrade legacy SHA-256 hashes and hashes made with older work factors
+        if self.hasher.needs_rehash(stored):
+            upgraded = self.hasher.hash(password)
+            with self.db.transaction():
+                self.cursor.execute("UPDATE users SET password=? WHERE email=? AND password=?",
+                                    (upgraded, email, stored))
+            stored = upgraded
+        if self.verify_cache is not None:
+            self.verify_cache.put((email, stored, token), True)
+        return True
+
+    def login_user_async(self, email, password):
+        """Future resolving to whether the credentials are valid, checked on the auth pool."""
+        return _executor.submit(self._verify, email, password)
 
     def login_user(self, email, password):
-        hashed_pw = self.hash_password(password)
-        self.cursor.execute("SELECT * FROM users WHERE email=? AND password=?", (email, hashed_pw))
-        return self.cursor.fetchone() is not None
+        """Check credentials on the auth pool, waiting for the result."""
+        return self.login_user_async(email, password).result()
+
+
+_managers = {}
+_managers_lock = threading.Lock()
+
+
+def get_auth_manager(db_name=None):
+    """
+    The process-wide AuthManager for db_name (users_db_name() by default).
+    Streamlit reruns the page script on every interaction, so sharing one
+    manager is what lets its verify cache see repeat logins.
+    """
+    db_name = db_name or users_db_name()
+    with _managers_lock:
+        manager = _managers.get(db_name)
+        if manager is None:
+            manager = _managers[db_name] = AuthManager(db_name)
+        return manager
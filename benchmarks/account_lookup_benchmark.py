@@ -0,0 +1,66 @@
+"""
+Measure Account.updateExpense / Account.deleteExpense latency as the expenses
+table grows, compared with the old approach of loading the whole table into
+pandas to find one id.
+
+Run from the project root:
+    python benchmarks/account_lookup_benchmark.py
+"""
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.expenseTracker import Account
+
+# Account reports through st.success/st.warning, which only log a warning outside `streamlit run`
+logging.disable(logging.WARNING)
+
+SIZES = [1_000, 10_000, 100_000, 1_000_000]
+OPERATIONS = 200
+LEGACY_MAX_ROWS = 100_000  # loading 1M rows per lookup takes minutes
+
+
+def seed(account, n_rows):
+    rows = [("2024-01-01", f"expense {i}", 10.0, "Food", "") for i in range(n_rows)]
+    account.ExpenseManager.addExpenses(rows)
+
+
+def legacy_lookup(account, expense_id):
+    expenses = account.ExpenseManager.viewExpenses()
+    if expense_id in expenses["id"].values:
+        return expenses.loc[expenses["id"] == expense_id, "amount"].iloc[0]
+    return None
+
+
+def per_op_ms(fn, ids):
+    start = time.perf_counter()
+    for expense_id in ids:
+        fn(expense_id)
+    return (time.perf_counter() - start) / len(ids) * 1000
+
+
+def main():
+    rng = random.Random(7)
+    print(f"{'rows':>9} {'update ms':>10} {'delete ms':>10} {'legacy lookup ms':>17}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for n_rows in SIZES:
+            account = Account(os.path.join(tmp, f"bench_{n_rows}.db"))
+            seed(account, n_rows)
+            ids = rng.sample(range(1, n_rows + 1), OPERATIONS)
+
+            update = per_op_ms(lambda i: account.updateExpense(i, "2024-02-01", "edited", 12.5, "Food", ""), ids)
+            delete = per_op_ms(account.deleteExpense, ids)
+            if n_rows <= LEGACY_MAX_ROWS:
+                legacy = f"{per_op_ms(lambda i: legacy_lookup(account, i), ids[:20]):>17.3f}"
+            else:
+                legacy = f"{'skipped':>17}"
+            print(f"{n_rows:>9} {update:>10.3f} {delete:>10.3f} {legacy}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Benchmark the compiled KeywordCategorizer against the original per-row
+guess_category loop from the Transaction Categorizer page.
+
+Run from the project root:
+    python benchmarks/categorizer_benchmark.py
+"""
+import os
+import random
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.categorizer import CATEGORY_KEYWORDS, KeywordCategorizer
+
+
+def legacy_guess_category(description, keywords=CATEGORY_KEYWORDS):
+    if not isinstance(description, str):
+        return 'Miscellaneous'
+    text = description.lower()
+    for cat, keys in keywords.items():
+        for k in keys:
+            if k in text:
+                return cat
+    return 'Miscellaneous'
+
+
+def merchant_table(n_keywords):
+    """The default table plus n_keywords synthetic merchant names spread over the categories."""
+    table = {cat: list(keys) for cat, keys in CATEGORY_KEYWORDS.items()}
+    cats = [c for c in table if c != 'Miscellaneous']
+    for i in range(n_keywords):
+        table[cats[i % len(cats)]].append(f"merchant{i:05d}")
+    return table
+
+
+def descriptions(n_rows, table):
+    rng = random.Random(42)
+    words = [k for keys in table.values() for k in keys] + ['neft transfer', 'atm cash', 'upi ref']
+    return pd.Series([f"POS {rng.randint(1000, 9999)} {rng.choice(words).upper()} #{i}" for i in range(n_rows)])
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def main():
+    print(f"{'rows':>8} {'keywords':>9} {'legacy s':>10} {'compiled s':>11} {'speedup':>8}")
+    for n_rows, n_keywords in [(10_000, 0), (100_000, 0), (10_000, 2_000), (50_000, 5_000)]:
+        table = merchant_table(n_keywords)
+        values = descriptions(n_rows, table)
+
+        expected, legacy = timed(lambda: values.map(lambda d: legacy_guess_category(d, table)))
+        engine = KeywordCategorizer(table)
+        got, compiled = timed(lambda: engine.categorize(values))
+
+        assert (expected == got).all(), "compiled categorizer disagrees with the legacy loop"
+        print(f"{n_rows:>8} {n_keywords:>9} {legacy:>10.3f} {compiled:>11.3f} {legacy / compiled:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Measure AuthManager login latency and throughput for each password hashing
+work factor, with the verify cache disabled so every login pays for the KDF.
+
+Latency is the mean of sequential logins; throughput submits logins from many
+threads at once, so it is bounded by the auth pool size (FINTRACK_AUTH_WORKERS).
+
+Run from the project root:
+    python benchmarks/password_hash_benchmark.py
+"""
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from auth import AUTH_WORKERS, AuthManager
+from utils.passwords import PasswordHasher
+
+SETTINGS = [
+    PasswordHasher("pbkdf2_sha256", iterations=100_000),
+    PasswordHasher("pbkdf2_sha256", iterations=600_000),
+    PasswordHasher("scrypt", n=2 ** 13),
+    PasswordHasher("scrypt", n=2 ** 14),
+    PasswordHasher("scrypt", n=2 ** 15),
+]
+SEQUENTIAL_LOGINS = 10
+CONCURRENT_LOGINS = 40
+CLIENT_THREADS = 16
+
+
+def measure(auth):
+    auth.register_user("bench@example.com", "correct horse")
+
+    began = time.perf_counter()
+    for _ in range(SEQUENTIAL_LOGINS):
+        assert auth.login_user("bench@example.com", "correct horse")
+    latency_ms = (time.perf_counter() - began) / SEQUENTIAL_LOGINS * 1000
+
+    with ThreadPoolExecutor(max_workers=CLIENT_THREADS) as clients:
+        began = time.perf_counter()
+        results = list(clients.map(lambda _: auth.login_user("bench@example.com", "correct horse"),
+                                   range(CONCURRENT_LOGINS)))
+        throughput = CONCURRENT_LOGINS / (time.perf_counter() - began)
+    assert all(results)
+    return latency_ms, throughput
+
+
+def main():
+    print(f"auth pool: {AUTH_WORKERS} workers, {CLIENT_THREADS} concurrent clients")
+    print(f"{'setting':<48} {'login ms':>9} {'logins/s':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for i, hasher in enumerate(SETTINGS):
+            auth = AuthManager(os.path.join(tmp, f"users_{i}.db"), hasher=hasher, verify_cache_size=0)
+            latency_ms, throughput = measure(auth)
+            print(f"{repr(hasher):<48} {latency_ms:>9.1f} {throughput:>9.1f}")
+
+        # With the verify cache, repeat logins (e.g. Streamlit reruns) skip the KDF
+        auth = AuthManager(os.path.join(tmp, "users_cached.db"), hasher=PasswordHasher("scrypt", n=2 ** 14))
+        latency_ms, throughput = measure(auth)
+        print(f"{'scrypt n=16384 with verify cache':<48} {latency_ms:>9.1f} {throughput:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Measure write throughput when several writers share one database, with the
+SQLite tuning layer (WAL, synchronous=NORMAL, busy_timeout, cache_size,
+mmap_size) on and off.
+
+Each writer is a separate process, like several Streamlit server processes
+sharing one database file, committing one expense at a time through
+ExpenseManager while one more process keeps reading the totals.
+
+Run from the project root:
+    python benchmarks/sqlite_tuning_benchmark.py
+"""
+import multiprocessing
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+WRITERS = [1, 2, 4, 8]
+WRITES_PER_WRITER = 300
+
+
+def writer(db_path, tuning, start, results):
+    os.environ["FINTRACK_SQLITE_TUNING"] = "1" if tuning else "0"
+    sys.path.insert(0, ROOT)
+    from utils.expenseTracker import ExpenseManager
+
+    manager = ExpenseManager(db_path)
+    start.wait()
+    errors = 0
+    for i in range(WRITES_PER_WRITER):
+        try:
+            manager.addExpense("2024-01-01", f"expense {i}", 10.0, "Food", "")
+        except sqlite3.OperationalError:
+            errors += 1
+    results.put(errors)
+
+
+def reader(db_path, tuning, stop):
+    os.environ["FINTRACK_SQLITE_TUNING"] = "1" if tuning else "0"
+    sys.path.insert(0, ROOT)
+    from utils.expenseTracker import Account
+
+    account = Account(db_path)
+    while not stop.is_set():
+        try:
+            account.ExpenseManager.totalExpenses()
+        except sqlite3.OperationalError:
+            pass
+
+
+def run(n_writers, tuning, tmp):
+    db_path = os.path.join(tmp, f"bench_{n_writers}_{int(tuning)}.db")
+    ctx = multiprocessing.get_context("spawn")
+    start, stop, results = ctx.Event(), ctx.Event(), ctx.Queue()
+
+    # Create the schema once before the writers race to open the file
+    setup = ctx.Process(target=writer, args=(db_path, tuning, start, results))
+    start.set()
+    setup.start()
+    setup.join()
+    results.get()
+    start.clear()
+
+    readers = [ctx.Process(target=reader, args=(db_path, tuning, stop))]
+    writers = [ctx.Process(target=writer, args=(db_path, tuning, start, results))
+               for _ in range(n_writers)]
+    for process in readers + writers:
+        process.start()
+    time.sleep(2)  # let every process import and open the database
+
+    began = time.perf_counter()
+    start.set()
+    errors = sum(results.get() for _ in writers)
+    elapsed = time.perf_counter() - began
+    stop.set()
+    for process in readers + writers:
+        process.join()
+
+    rows = n_writers * WRITES_PER_WRITER - errors
+    return rows / elapsed, errors
+
+
+def main():
+    print(f"{'writers':>8} {'default rows/s':>15} {'errors':>7} {'tuned rows/s':>13} {'errors':>7} {'speedup':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for n_writers in WRITERS:
+            default_rate, default_errors = run(n_writers, False, tmp)
+            tuned_rate, tuned_errors = run(n_writers, True, tmp)
+            print(f"{n_writers:>8} {default_rate:>15.0f} {default_errors:>7} {tuned_rate:>13.0f} {tuned_errors:>7} "
+                  f"{tuned_rate / default_rate:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
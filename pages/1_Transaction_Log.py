@@ -1,6 +1,6 @@
 import streamlit as st
-from utils.expenseTracker import Account  
-import time  
+from utils.expenseTracker import get_account  
+from utils.storage import user_storage
 import datetime
 from utils.chatbot_ui import render_finbot_sidebar
 
@@ -10,8 +10,7 @@ if "logged_in" not in st.session_state or not st.session_state.logged_in:
     st.stop()
 
 user_email = st.session_state.user_email
-db_name = f"{user_email}.db"  
-account = Account(db_name=db_name)
+account = get_account(user_storage(user_email))
 
 # Render FinBot in sidebar
 render_finbot_sidebar(account, user_email)
@@ -79,7 +78,6 @@ with st.expander("Add New Expense", expanded=st.session_state.expense_expanded):
                 st.session_state.expense_expanded = True
                 # request a reset on the next run (do NOT set widget keys now)
                 st.session_state.reset_expense_form = True
-                time.sleep(1.0)
                 st.rerun()
 
 
@@ -109,7 +107,6 @@ with st.expander("⬇ Add New Income", expanded=st.session_state.income_expanded
                 st.session_state.income_expanded = True
                 # request a reset on the next run (do NOT set widget keys now)
                 st.session_state.reset_income_form = True
-                time.sleep(1.0)
                 st.rerun()
 
 
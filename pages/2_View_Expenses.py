@@ -1,6 +1,6 @@
 import streamlit as st
-from utils.expenseTracker import Account  
-import time
+from utils.expenseTracker import get_account  
+from utils.storage import user_storage
 from utils.chatbot_ui import render_finbot_sidebar
 
 if "logged_in" not in st.session_state or not st.session_state.logged_in:
@@ -8,25 +8,63 @@ if "logged_in" not in st.session_state or not st.session_state.logged_in:
     st.stop()
 
 user_email = st.session_state.user_email
-db_name = f"{user_email}.db"  
-
-account = Account(db_name=db_name)
+account = get_account(user_storage(user_email))
 
 # Render FinBot in sidebar
 render_finbot_sidebar(account, user_email)
 
+EXPENSE_CATEGORIES = ["Food", "Personal", "Transport", "Investment", "Medicine", "Miscellaneous"]
+INCOME_SOURCES = ["Salary", "Family", "Investment", "Other"]
+
+
+def browse_controls(key, label_name, label_options, sort_columns):
+    """Render filter, sort and paging widgets; returns (filters, page, page_size, sort_by, descending)."""
+    filters = {}
+    with st.expander("Filter & sort"):
+        if st.checkbox("Filter by date", key=f"{key}_use_dates"):
+            dates = st.date_input("Date range", value=(), key=f"{key}_dates")
+            if len(dates) == 2:
+                filters["start_date"], filters["end_date"] = dates
+        labels = st.multiselect(label_name.capitalize(), label_options, key=f"{key}_labels")
+        if labels:
+            filters[label_name] = labels
+        c1, c2 = st.columns(2)
+        min_amount = c1.number_input("Min amount", min_value=0.0, value=0.0, key=f"{key}_min")
+        max_amount = c2.number_input("Max amount (0 = no limit)", min_value=0.0, value=0.0, key=f"{key}_max")
+        if min_amount > 0:
+            filters["min_amount"] = min_amount
+        if max_amount > 0:
+            filters["max_amount"] = max_amount
+        c1, c2, c3 = st.columns(3)
+        sort_by = c1.selectbox("Sort by", sort_columns, key=f"{key}_sort")
+        descending = c2.radio("Order", ["Ascending", "Descending"], key=f"{key}_order", horizontal=True) == "Descending"
+        page_size = c3.selectbox("Rows per page", [25, 50, 100, 250], index=1, key=f"{key}_size")
+    page = st.session_state.get(f"{key}_page", 1)
+    return filters, page, page_size, sort_by, descending
+
+
+def show_page(rows, total, page_size, key, empty_message):
+    """Render one page of rows with a page selector sized to the filtered total."""
+    if total == 0:
+        st.caption(empty_message)
+        return
+    pages = (total + page_size - 1) // page_size
+    if st.session_state.get(f"{key}_page", 1) > pages:
+        st.session_state[f"{key}_page"] = pages
+    st.dataframe(rows)
+    st.number_input(f"Page (of {pages}) — {total} matching rows", min_value=1, max_value=pages, step=1, key=f"{key}_page")
+
+
 st.title("Your Transactions")
 st.divider()
 
 # Expenses Section
 st.subheader("View Expenses")
-expenses_df = account.expenseList()
-if expenses_df.empty:
-    st.caption("No expenses to show!")
-else:
-    st.dataframe(expenses_df)
+filters, page, page_size, sort_by, descending = browse_controls("exp", "categories", EXPENSE_CATEGORIES, ["id", "date", "name", "amount", "category"])
+expenses_df, expense_total = account.expensePage(page, page_size, sort_by, descending, **filters)
+show_page(expenses_df, expense_total, page_size, "exp", "No expenses to show!")
 
-if not expenses_df.empty:
+if account.ExpenseManager.countExpenses() > 0:
     col1, col2 = st.columns(2)
     
     with col1:
@@ -35,8 +73,8 @@ if not expenses_df.empty:
                 edit_exp_id = st.number_input("Expense ID to Edit", min_value=1, step=1, key="edit_exp_id")
                 
                 # Try to load existing data
-                if edit_exp_id > 0 and edit_exp_id in expenses_df["id"].values:
-                    existing_exp = expenses_df[expenses_df["id"] == edit_exp_id].iloc[0]
+                existing_exp = account.getExpenseById(edit_exp_id)
+                if existing_exp is not None:
                     
                     edit_exp_name = st.text_input("Expense Title", value=existing_exp["name"])
                     edit_exp_date = st.date_input("Date", value=existing_exp["date"])
@@ -56,7 +94,7 @@ if not expenses_df.empty:
                     edit_exp_category = st.selectbox("Category", ["-","Food", "Personal", "Transport", "Investment", "Medicine", "Miscellaneous"])
                 
                 if st.form_submit_button("Update Expense"):
-                    if edit_exp_id > 0 and edit_exp_id in expenses_df["id"].values:
+                    if existing_exp is not None:
                         if edit_exp_amount <= 0:
                             st.error("Amount must be greater than 0!")
                         elif edit_exp_category == "-":
@@ -64,7 +102,6 @@ if not expenses_df.empty:
                         else:
                             account.updateExpense(edit_exp_id, edit_exp_date, edit_exp_name, edit_exp_amount, edit_exp_category, edit_exp_des)
                             st.toast("Expense Updated Successfully!")
-                            time.sleep(1.5)
                             st.rerun()
                     else:
                         st.error("Please enter a valid Expense ID")
@@ -76,19 +113,16 @@ if not expenses_df.empty:
                 if st.form_submit_button("Delete"):
                     account.deleteExpense(expense_id)
                     st.toast("Expense Deleted Successfully!")
-                    time.sleep(1.5)
                     st.rerun()
 
 # Income Section
 st.subheader("View Income")
-income_df = account.incomeList()
-if income_df.empty:
-    st.caption("No incomes to show!")
-else:
-    st.dataframe(income_df)
+filters, page, page_size, sort_by, descending = browse_controls("inc", "sources", INCOME_SOURCES, ["id", "date", "name", "amount", "source"])
+income_df, income_total = account.incomePage(page, page_size, sort_by, descending, **filters)
+show_page(income_df, income_total, page_size, "inc", "No incomes to show!")
 
 # Delete Income
-if not income_df.empty:
+if account.IncomeManager.countIncome() > 0:
     col1, col2 = st.columns(2)
     
     with col1:
@@ -97,8 +131,8 @@ if not income_df.empty:
                 edit_inc_id = st.number_input("Income ID to Edit", min_value=1, step=1, key="edit_inc_id")
                 
                 # Try to load existing data
-                if edit_inc_id > 0 and edit_inc_id in income_df["id"].values:
-                    existing_inc = income_df[income_df["id"] == edit_inc_id].iloc[0]
+                existing_inc = account.getIncomeById(edit_inc_id)
+                if existing_inc is not None:
                     
                     edit_inc_name = st.text_input("Income Title", value=existing_inc["name"])
                     edit_inc_date = st.date_input("Date", value=existing_inc["date"])
@@ -118,7 +152,7 @@ if not income_df.empty:
                     edit_inc_source = st.selectbox("Source", ["-","Salary", "Family", "Investment", "Other"])
                 
                 if st.form_submit_button("Update Income"):
-                    if edit_inc_id > 0 and edit_inc_id in income_df["id"].values:
+                    if existing_inc is not None:
                         if edit_inc_amount <= 0:
                             st.error("Amount must be greater than 0!")
                         elif edit_inc_source == "-":
@@ -126,7 +160,6 @@ if not income_df.empty:
                         else:
                             account.updateIncome(edit_inc_id, edit_inc_date, edit_inc_name, edit_inc_amount, edit_inc_source, edit_inc_des)
                             st.toast("Income Updated Successfully!")
-                            time.sleep(1.5)
                             st.rerun()
                     else:
                         st.error("Please enter a valid Income ID")
@@ -138,5 +171,4 @@ if not income_df.empty:
                 if st.form_submit_button("Delete"):
                     account.deleteIncome(income_id)
                     st.toast("Income Deleted Successfully!")
-                    time.sleep(1.5)
                     st.rerun()
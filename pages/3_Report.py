@@ -1,7 +1,11 @@
 import streamlit as st
-import pandas as pd
-import plotly.express as px
-from utils.expenseTracker import Account  
+from utils.expenseTracker import get_account  
+from utils.storage import user_storage
+from utils.reports import build_snapshot_report, cached_report, get_report
+from utils.jobs import get_job_runner, FINISHED, CANCELLED, DONE
+from utils.jobs_ui import render_job_progress
+from utils.export import FORMATS, PYARROW_AVAILABLE, read_table_files
+import io
 from utils.chatbot_ui import render_finbot_sidebar
 
 
@@ -11,8 +15,7 @@ if "logged_in" not in st.session_state or not st.session_state.logged_in:
     st.stop()
 
 user_email = st.session_state.user_email
-db_name = f"{user_email}.db"
-account = Account(db_name=db_name)
+account = get_account(user_storage(user_email))
 
 # Render FinBot in sidebar
 render_finbot_sidebar(account, user_email)
@@ -20,89 +23,91 @@ render_finbot_sidebar(account, user_email)
 st.title("Financial Reports")
 st.write("A finance report of your cash.")
 st.divider()
-expenses_df = account.expenseList()
-income_df = account.incomeList()
-
-
-if not expenses_df.empty:
-    expenses_df['date'] = pd.to_datetime(expenses_df['date'])
-if not income_df.empty:
-    income_df['date'] = pd.to_datetime(income_df['date'])
-
-col1, col2 = st.columns(2)
-with col1:
-    if not expenses_df.empty:
-      
-        if not expenses_df.empty:
-            category_data = expenses_df.groupby("category")["amount"].sum().reset_index()
-            fig_expense_pie = px.pie(
-                category_data,
-                values="amount",
-                names="category",
-                title="Expenses by Category",
-                hole=0.4
-            )
-            st.plotly_chart(fig_expense_pie)
+# Cached per data version: unchanged data means no pandas or Plotly work on rerun.
+# After a change the report is rebuilt by a background job; small ledgers finish
+# within REPORT_WAIT_SECONDS and render straight away, larger ones show progress.
+REPORT_WAIT_SECONDS = 0.5
+
+report = cached_report(account)
+if report is None:
+    jobs = get_job_runner()
+    version = account.dataVersion()
+    pending = st.session_state.get("report_job")
+    if pending is None or pending[0] != version:
+        def build_report_job(job):
+            job.progress(None, "building charts...")
+            get_report(account)
+            return {"data_version": version}
+
+        pending = st.session_state.report_job = (version, jobs.submit("report", build_report_job, owner=user_email))
+    job = jobs.wait(pending[1], timeout=REPORT_WAIT_SECONDS)
+    if job is None or job["status"] == DONE:
+        report = get_report(account)
+    elif job["status"] not in FINISHED:
+        render_job_progress(pending[1], "Building report")
+        st.stop()
+    else:
+        if job["status"] == CANCELLED:
+            st.info("Report build cancelled.")
         else:
-            st.write("No expenses recorded yet.")
+            st.error(f"Could not build the report: {job['error']}")
+        if st.button("Rebuild report"):
+            del st.session_state.report_job
+            st.rerun()
+        st.stop()
 
-# Income Breakdown
-with col2:
-    if not income_df.empty:
 
-      
-        if not income_df.empty:
-            income_data = income_df.groupby("source")["amount"].sum().reset_index()
-            fig_income_pie = px.pie(
-                income_data,
-                values="amount",
-                names="source",
-                title="Income Breakdown by Category",
-                hole=0.4
-            )
-            st.plotly_chart(fig_income_pie)
+def render_figures(figures, key=""):
+    """Lay out a report's charts; key keeps a second report's charts distinct."""
+    col1, col2 = st.columns(2)
+    with col1:
+        if figures["expense_pie"] is not None:
+            st.plotly_chart(figures["expense_pie"], key=f"{key}expense_pie")
 
+    # Income Breakdown
+    with col2:
+        if figures["income_pie"] is not None:
+            st.plotly_chart(figures["income_pie"], key=f"{key}income_pie")
 
+    for name in ("trend_area", "category_bar", "stacked_bar"):
+        if figures[name] is not None:
+            st.plotly_chart(figures[name], key=f"{key}{name}")
 
-if not expenses_df.empty and not income_df.empty:
-   
 
-    expenses_df["month"] = expenses_df["date"].dt.strftime("%Y-%m")
-    income_df["month"] = income_df["date"].dt.strftime("%Y-%m")
+render_figures(report["figures"])
 
-    monthly_expense = expenses_df.groupby("month")["amount"].sum().reset_index()
-    monthly_income = income_df.groupby("month")["amount"].sum().reset_index()
-
-    # Create an area chart (stacked)
-    fig = px.area(
-        pd.concat([monthly_expense.assign(Type="Expense"), monthly_income.assign(Type="Income")]),
-        x="month",
-        y="amount",
-        color="Type",
-        title="Monthly Expense vs Income Trend",
-        line_group="Type", 
-        markers=True
-    )
-    st.plotly_chart(fig)
-
-
-# Bar Chart: Monthly Spending by Category
-
-if not expenses_df.empty:
-    
-    category_monthly_data = expenses_df.groupby(["month", "category"])["amount"].sum().reset_index()
-    fig_category_bar = px.bar(category_monthly_data, x="month", y="amount", color="category", barmode="group", title="Monthly Spending by Category")
-    st.plotly_chart(fig_category_bar)
-
-
-
-# Stacked Bar Chart: Income vs Expenses
-
-if not expenses_df.empty and not income_df.empty:
-  
-    stacked_data = pd.concat([
-        monthly_expense.assign(Type="Expense"),
-        monthly_income.assign(Type="Income")
-    ])
-    fig_stacked_bar = px.bar(stacked_data, x="month", y="amount", color="Type", barmode="stack", title="Stacked Income vs Expenses")
-    st.plotly_chart(fig_stacked_bar)
+st.divider()
+with st.expander("Export data"):
+    if not PYARROW_AVAILABLE:
+        st.info("Install the optional pyarrow package to export your ledger as Parquet or Arrow files.")
+    else:
+        export_format = st.radio("Format", list(FORMATS), horizontal=True, key="export_format")
+        if st.button("Prepare export", key="export_btn"):
+            exports = {}
+            with st.spinner("Exporting..."):
+                for table in ("expenses", "income"):
+                    buffer = io.BytesIO()
+                    account.exportTable(table, buffer, fmt=export_format)
+                    exports[table] = buffer.getvalue()
+            st.session_state.export_files = (export_format, exports)
+
+        if "export_files" in st.session_state:
+            export_format, exports = st.session_state.export_files
+            for table, data in exports.items():
+                st.download_button(f"Download {table}{FORMATS[export_format]}", data,
+                                   file_name=f"{table}{FORMATS[export_format]}", key=f"download_{table}")
+
+with st.expander("Report from exported files"):
+    if not PYARROW_AVAILABLE:
+        st.info("Install the optional pyarrow package to read Parquet or Arrow exports.")
+    else:
+        st.write("Upload expenses and income files exported above to view their report without the live ledger.")
+        snapshot_files = st.file_uploader("Exported files", type=[ext.lstrip(".") for ext in FORMATS.values()],
+                                          accept_multiple_files=True, key="snapshot_files")
+        if snapshot_files:
+            try:
+                snapshot_report = build_snapshot_report(read_table_files(snapshot_files))
+            except Exception as e:
+                st.error(f"Could not read the exported files: {e}")
+            else:
+                render_figures(snapshot_report["figures"], key="snapshot_")
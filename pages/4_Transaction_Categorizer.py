@@ -1,10 +1,14 @@
 import streamlit as st
 import pandas as pd
-import datetime
 import io
-import time
-from utils.expenseTracker import Account
+from utils.expenseTracker import get_account
+from utils.storage import user_storage
 from utils.chatbot_ui import render_finbot_sidebar
+from utils.categorizer import get_categorizer, load_keyword_table
+from utils.jobs import get_job_runner, FINISHED, DONE, CANCELLED
+from utils.jobs_ui import render_job_progress
+from utils.statements import (cached_sample, cached_preview, iter_statement, prepare_transactions,
+                              fingerprint_transactions, SIGN_FROM_AMOUNT, SIGN_FROM_TYPE, SIGN_FROM_BOTH)
 
 
 if "logged_in" not in st.session_state or not st.session_state.logged_in:
@@ -12,8 +16,7 @@ if "logged_in" not in st.session_state or not st.session_state.logged_in:
     st.stop()
 
 user_email = st.session_state.user_email
-db_name = f"{user_email}.db"
-account = Account(db_name=db_name)
+account = get_account(user_storage(user_email))
 
 render_finbot_sidebar(account, user_email)
 
@@ -21,124 +24,102 @@ st.title("Transaction Categorizer")
 st.write("Upload bank transactions (CSV / Excel). Select the relevant columns and preview how the rows will be classified before importing into your account.")
 st.divider()
 
+jobs = get_job_runner()
+import_job = st.session_state.get("import_job")
+if import_job is not None:
+    job = jobs.get(import_job)
+    if job is not None and job["status"] not in FINISHED:
+        # Only the progress is shown while importing, so the same upload cannot
+        # be submitted twice
+        render_job_progress(import_job, "Importing transactions")
+        st.stop()
+    del st.session_state.import_job
+    if job is not None and job["status"] == DONE:
+        summary = job["result"]
+        st.success(f"Import finished — added: {summary['added']} ({summary['expenses']} expenses, {summary['income']} income), skipped: {summary['skipped']}, already imported: {summary['duplicates']}")
+    elif job is not None and job["status"] == CANCELLED:
+        st.warning("Import cancelled, no rows were added.")
+    elif job is not None:
+        st.error(f"Import failed, no rows were added: {job['error']}")
 
-uploaded_file = st.file_uploader("Upload CSV or Excel file", type=["csv", "xlsx"], help="Columns should include at least amount and description; date column is optional.")
-
-def _parse_amount(v):
-    try:
-        if pd.isna(v):
-            return None
-        s = str(v)
-        # Remove common currency symbols and commas
-        s = s.replace(',', '')
-        s = s.replace('₹', '').replace('$', '').replace('€', '')
-        # If value contains parentheses treat as negative (bank style)
-        if '(' in s and ')' in s:
-            s = s.replace('(', '-').replace(')', '')
-        # Remove any non-numeric except minus and dot
-        cleaned = ''.join(ch for ch in s if (ch.isdigit() or ch in '-.'))
-        if cleaned in ['', '-', '.']:
-            return None
-        return float(cleaned)
-    except Exception:
-        return None
-
-
-# Simple keyword-based category assignment
-CATEGORY_KEYWORDS = {
-    'Food': ['restaurant', 'cafe', 'dominos', 'pizza', 'burger', 'dine', 'canteen', 'kfc', 'canteen'],
-    'Transport': ['uber', 'ola', 'taxi', 'metro', 'bus', 'fuel', 'petrol', 'petrolpump'],
-    'Personal': ['shopping', 'flipkart', 'amazon', 'myntra', 'zomato', 'swiggy'],
-    'Medicine': ['pharmacy', 'medic', 'pharmeasy', 'apollo'],
-    'Investment': ['mutual', 'sip', 'investment', 'broker', 'demat'],
-    'Salary': ['salary', 'payroll', 'paytm salary', 'salary credit'],
-    'Miscellaneous': []
-}
-
-def guess_category(description):
-    if not isinstance(description, str):
-        return 'Miscellaneous'
-    text = description.lower()
-    for cat, keys in CATEGORY_KEYWORDS.items():
-        for k in keys:
-            if k in text:
-                return cat
-    return 'Miscellaneous'
 
+uploaded_file = st.file_uploader("Upload CSV or Excel file", type=["csv", "xlsx"], help="Columns should include at least amount and description; date column is optional.")
 
 if uploaded_file is not None:
+    # Only the first rows are parsed here, once per file content; the whole file
+    # is streamed in chunks on import
     try:
-        if uploaded_file.name.lower().endswith('.csv'):
-            df = pd.read_csv(uploaded_file)
-        else:
-            df = pd.read_excel(uploaded_file)
+        digest, sample = cached_sample(uploaded_file)
     except Exception as e:
         st.error(f"Failed to read file: {e}")
         st.stop()
 
-    if df.empty:
+    if sample.empty:
         st.info("Uploaded file is empty.")
         st.stop()
 
     st.subheader("Preview of uploaded data")
-    st.dataframe(df.head(50))
+    st.dataframe(sample.head(50))
 
-    cols = df.columns.tolist()
+    cols = sample.columns.tolist()
     amount_col = st.selectbox("Select Amount column", cols, help="Select the column that contains transaction amounts")
     cat_col = st.selectbox("Select Category column", cols, index=0 if len(cols)>0 else 0, help="Select column that contains transaction categories")
     date_col = st.selectbox("Select Date column (optional)", ["None"] + cols, index=0)
     type_col = st.selectbox("Select Type/Indicator column (optional)", ["None"] + cols, index=0)
-
-    sign_handling = st.radio("How should debit/credit be detected?", options=[
-        "Use sign of amount (negative = debit)",
-        "Use Type/Indicator column (detect words like debit/dr/credit/cr)",
-        "Try both (type column preferred)"
-    ], index=2)
-
-    use_preview_limit = st.number_input("Rows to preview", min_value=1, max_value=min(500, len(df)), value=min(50, len(df)))
-
-    preview = df.copy()
-
-    def detect_direction(row):
-        a = _parse_amount(row.get(amount_col))
-        t = None
-        if type_col != "None":
-            val = row.get(type_col)
-            if isinstance(val, str):
-                v = val.lower()
-                if any(x in v for x in ['dr', 'debit', 'withdraw', 'payment']):
-                    t = 'debit'
-                elif any(x in v for x in ['cr', 'credit', 'deposit']):
-                    t = 'credit'
-        if sign_handling == "Use sign of amount (negative = debit)":
-            if a is None:
-                return 'unknown'
-            return 'debit' if a < 0 else 'credit'
-        elif sign_handling == "Use Type/Indicator column (detect words like debit/dr/credit/cr)":
-            return t or 'unknown'
-        else:
-            if t is not None:
-                return t
-            if a is None:
-                return 'unknown'
-            return 'debit' if a < 0 else 'credit'
-
-    preview['__parsed_amount__'] = preview[amount_col].apply(_parse_amount)
-    preview['direction'] = preview.apply(detect_direction, axis=1)
-    # single positive amount column
-    preview['amount'] = preview['__parsed_amount__'].apply(lambda x: abs(x) if x is not None else None)
-    # Use category from the selected file column
-    preview['category'] = preview[cat_col].astype(str)
+    desc_col = st.selectbox("Guess category from description column (optional)", ["None"] + cols, index=0, help="Match keywords in this column instead of using the Category column")
+    keyword_file = None
+    if desc_col != "None":
+        keyword_file = st.file_uploader("Custom keyword table (optional)", type=["csv"], help="CSV with 'category' and 'keyword' columns; earlier categories take priority")
+
+    sign_options = {
+        "Use sign of amount (negative = debit)": SIGN_FROM_AMOUNT,
+        "Use Type/Indicator column (detect words like debit/dr/credit/cr)": SIGN_FROM_TYPE,
+        "Try both (type column preferred)": SIGN_FROM_BOTH,
+    }
+    sign_handling = st.radio("How should debit/credit be detected?", options=list(sign_options), index=2)
+
+    use_preview_limit = st.number_input("Rows to preview", min_value=1, max_value=min(500, len(sample)), value=min(50, len(sample)))
+
+    categorizer = None
+    if desc_col != "None":
+        try:
+            keywords = load_keyword_table(keyword_file) if keyword_file is not None else None
+        except Exception as e:
+            st.error(f"Failed to read keyword table: {e}")
+            st.stop()
+        categorizer = get_categorizer(keywords)
+
+    mapping = {
+        'amount_col': amount_col,
+        'category_col': cat_col,
+        'date_col': None if date_col == "None" else date_col,
+        'type_col': None if type_col == "None" else type_col,
+        'desc_col': None if desc_col == "None" else desc_col,
+        'sign_mode': sign_options[sign_handling],
+        'categorizer': categorizer,
+    }
+    # Reruns with the same file and mapping reuse the cached preview
+    preview = cached_preview(digest, sample, **mapping)
+
+    if categorizer is not None:
+        hits = categorizer.hit_counts(sample[mapping['desc_col']])
+        st.caption(f"Keyword matches per category (first {len(sample)} rows): "
+                   + ", ".join(f"{cat}: {n}" for cat, n in hits.items()))
 
     st.subheader("Preview: detected direction and category")
     # Build a clean display DataFrame with unique column names to avoid duplicate-column errors
+    shown = preview.head(int(use_preview_limit))
     display_df = pd.DataFrame({
-        'date': preview[date_col] if date_col != "None" else 'N/A',
-        'amount': preview['amount'],
-        'category': preview['category'],
-        'direction': preview['direction']
-    }).head(int(use_preview_limit))
+        'date': shown['date'] if 'date' in shown else 'N/A',
+        # single positive amount column
+        'amount': shown['amount'].abs(),
+        'category': shown['category'],
+        'direction': shown['direction'],
+        'already imported': shown['fingerprint'].isin(account.knownFingerprints(shown['fingerprint'].tolist())),
+    })
     st.dataframe(display_df)
+    if display_df['already imported'].any():
+        st.warning(f"{int(display_df['already imported'].sum())} of the previewed rows match transactions imported before.")
 
     st.markdown("---")
     st.write("If the preview looks good you can import the rows. Rows with direction 'unknown' will be skipped unless you choose to import them as debit (expense) or credit (income) via the fallback option.")
@@ -147,56 +128,46 @@ if uploaded_file is not None:
     default_expense_category = st.selectbox("Default category for unmatched expenses", ["Miscellaneous", "Food", "Personal", "Transport", "Investment", "Medicine"], index=0)
     default_income_source = st.text_input("Default source label for imported incomes", value="Other")
 
+    title_override = st.text_input("Title for imported rows (optional)", value="", help="Leave empty to use each row's category as its title")
+    desc_override = st.text_input("Description for imported rows (optional)", value="")
+    duplicate_handling = st.radio("Rows already imported from an earlier statement:",
+                                  options=["Skip duplicates", "Import anyway"], index=0)
+
     if st.button("Import Transactions"):
-        added = 0
-        skipped = 0
-        errors = 0
-        for idx, row in preview.iterrows():
-            try:
-                direction = row.get('direction')
-                parsed = row.get('__parsed_amount__')
-                if parsed is None:
-                    skipped += 1
-                    continue
-                amt = abs(parsed)
-                file_cat = str(row.get('category'))[:200]
-                name = title_override.strip() if title_override.strip() else file_cat
-                description = desc_override.strip() if desc_override.strip() else ""
-                if date_col != "None":
-                    raw_date = row.get(date_col)
-                    try:
-                        dt = pd.to_datetime(raw_date).date()
-                    except Exception:
-                        dt = datetime.date.today()
-                else:
-                    dt = datetime.date.today()
-
-                if direction == 'debit':
-                    cat = row.get('category') or default_expense_category
-                    account.addExpense(dt, name, float(amt), cat, description)
-                    added += 1
-                elif direction == 'credit':
-                    src = default_income_source
-                    account.addIncome(dt, name, float(amt), src, description)
-                    added += 1
-                else:
-                    # unknown
-                    if fallback_for_unknown == 'Skip':
-                        skipped += 1
-                        continue
-                    elif fallback_for_unknown == 'Debit (Expense)':
-                        cat = row.get('category') or default_expense_category
-                        account.addExpense(dt, name, float(amt), cat, description)
-                        added += 1
-                    else:
-                        account.addIncome(dt, name, float(amt), default_income_source, description)
-                        added += 1
-                time.sleep(0.05)
-            except Exception as e:
-                errors += 1
-                st.write(f"Row {idx} error: {e}")
-
-        st.success(f"Import finished — added: {added}, skipped: {skipped}, errors: {errors}")
+        # The import runs on a background worker with its own copy of the upload,
+        # so this page can keep polling it (and reruns never move its read position)
+        source = io.BytesIO(uploaded_file.getvalue())
+        source.name = uploaded_file.name
+        size = max(len(source.getbuffer()), 1)
+        # Excel files are read through a zip archive, so the byte position says little about progress
+        measurable = not uploaded_file.name.lower().endswith((".xlsx", ".xls"))
+
+        # Read only the mapped columns, one chunk at a time
+        label_col = mapping['desc_col'] if categorizer is not None else cat_col
+        columns = [c for c in (amount_col, label_col, mapping['date_col'], mapping['type_col']) if c is not None]
+        # One occurrence counter for the whole file keeps fingerprints independent of chunking
+        occurrences = {}
+        chunks = (fingerprint_transactions(prepare_transactions(chunk, **mapping), occurrences)
+                  for chunk in iter_statement(source, columns))
+
+        unknown_as = {"Debit (Expense)": "debit", "Credit (Income)": "credit"}.get(fallback_for_unknown)
+        import_options = dict(
+            unknown_as=unknown_as,
+            default_expense_category=default_expense_category,
+            default_income_source=default_income_source,
+            name=title_override,
+            description=desc_override.strip(),
+            duplicates="skip" if duplicate_handling == "Skip duplicates" else "keep",
+        )
+
+        def run_import(job):
+            # Raising JobCancelled from the progress callback rolls the whole import back
+            def progress(totals):
+                job.progress(source.tell() / size if measurable else None,
+                             f"processed {totals['added'] + totals['skipped']} rows")
+            return account.importTransactionChunks(chunks, progress=progress, **import_options)
+
+        st.session_state.import_job = jobs.submit("import", run_import, owner=user_email)
         st.rerun()
 
 else:
@@ -0,0 +1,125 @@
+import re
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_CATEGORY = 'Miscellaneous'
+# Label hit_counts uses for rows no keyword matched
+UNMATCHED = 'unmatched'
+
+# Simple keyword-based category assignment; earlier categories win when several match
+CATEGORY_KEYWORDS = {
+    'Food': ['restaurant', 'cafe', 'dominos', 'pizza', 'burger', 'dine', 'canteen', 'kfc', 'canteen'],
+    'Transport': ['uber', 'ola', 'taxi', 'metro', 'bus', 'fuel', 'petrol', 'petrolpump'],
+    'Personal': ['shopping', 'flipkart', 'amazon', 'myntra', 'zomato', 'swiggy'],
+    'Medicine': ['pharmacy', 'medic', 'pharmeasy', 'apollo'],
+    'Investment': ['mutual', 'sip', 'investment', 'broker', 'demat'],
+    'Salary': ['salary', 'payroll', 'paytm salary', 'salary credit'],
+    'Miscellaneous': []
+}
+
+
+class KeywordCategorizer:
+    """
+    Classify transaction descriptions by case-insensitive keyword substrings.
+
+    Each category's keywords are compiled once into a single alternation regex.
+    A whole Series is classified with one vectorized scan per category, and
+    only rows that are still unmatched are scanned by later categories, so
+    category order gives the same priority as the old nested loop.
+    """
+
+    def __init__(self, keywords=None, default=DEFAULT_CATEGORY):
+        table = CATEGORY_KEYWORDS if keywords is None else keywords
+        self.default = default
+        self.categories = list(table)
+        self.rules = []
+        for cat, keys in table.items():
+            # Dedupe while keeping order so the pattern is stable across runs
+            words = list(dict.fromkeys(str(k).lower() for k in keys if str(k).strip()))
+            if words:
+                self.rules.append((cat, re.compile('|'.join(re.escape(w) for w in words))))
+
+    @property
+    def key(self):
+        """Hashable identity of the rules, for caching results across instances."""
+        return (tuple((cat, pattern.pattern) for cat, pattern in self.rules), self.default)
+
+    def _classify(self, values):
+        """(category array, keyword-hit mask) for a Series of descriptions."""
+        result = np.full(len(values), self.default, dtype=object)
+        matched = np.zeros(len(values), dtype=bool)
+        try:
+            text = values.str.lower().reset_index(drop=True)
+        except AttributeError:
+            # .str is only available on columns holding strings
+            return result, matched
+
+        pending = np.flatnonzero(text.notna().to_numpy())
+        for cat, pattern in self.rules:
+            if pending.size == 0:
+                break
+            hit = text.iloc[pending].str.contains(pattern, regex=True).to_numpy(dtype=bool)
+            result[pending[hit]] = cat
+            matched[pending[hit]] = True
+            pending = pending[~hit]
+        return result, matched
+
+    def categorize(self, values):
+        """
+        Return a Series of category names aligned with values.
+        Non-string cells and rows with no keyword hit get the default category.
+        """
+        return pd.Series(self._classify(values)[0], index=values.index, dtype=object)
+
+    def hit_counts(self, values):
+        """
+        Count keyword matches per category (including zero-hit categories) in a
+        Series of descriptions. Rows no keyword matched are counted under
+        UNMATCHED, not under the default category they are assigned.
+        """
+        result, matched = self._classify(values)
+        counts = dict.fromkeys([cat for cat, _ in self.rules], 0)
+        counts.update(pd.Series(result[matched], dtype=object).value_counts().to_dict())
+        counts[UNMATCHED] = int((~matched).sum())
+        return counts
+
+    def guess(self, description):
+        """Categorize a single description."""
+        if not isinstance(description, str):
+            return self.default
+        return self.categorize(pd.Series([description], dtype=object)).iloc[0]
+
+
+def _freeze(keywords):
+    return tuple((cat, tuple(keys)) for cat, keys in keywords.items())
+
+
+@lru_cache(maxsize=16)
+def _cached_categorizer(frozen, default):
+    return KeywordCategorizer({cat: list(keys) for cat, keys in frozen}, default)
+
+
+def get_categorizer(keywords=None, default=DEFAULT_CATEGORY):
+    """
+    Return a compiled KeywordCategorizer for a keyword table, building it only
+    the first time that table is seen in this process.
+    """
+    return _cached_categorizer(_freeze(CATEGORY_KEYWORDS if keywords is None else keywords), default)
+
+
+def load_keyword_table(file):
+    """
+    Read a user keyword table from a CSV with 'category' and 'keyword' columns.
+    Categories keep the order they first appear in, which is their priority.
+    """
+    table = pd.read_csv(file, usecols=['category', 'keyword'], dtype=str).dropna()
+    keywords = {}
+    for cat, word in zip(table['category'].str.strip(), table['keyword'].str.strip()):
+        keywords.setdefault(cat, []).append(word)
+    return keywords
+
+
+def guess_category(description):
+    return get_categorizer().guess(description)
@@ -1,5 +1,6 @@
 import streamlit as st
-from utils.finbot import get_budget_insights
+from utils.finbot import get_budget_insights, stream_budget_insights, start_model_warmup
+from utils.retrieval import retrieve_context
 
 def render_finbot_sidebar(account, user_email):
     """
@@ -10,6 +11,9 @@ def render_finbot_sidebar(account, user_email):
         account: Account object with access to transactions
         user_email: User's email for personalization
     """
+    # Load the model in the background before the first question (no-op once started)
+    start_model_warmup()
+
     with st.sidebar:
         st.markdown(
             """
@@ -62,9 +66,15 @@ def render_finbot_sidebar(account, user_email):
 
             if st.button("Send ▶", key="finbot_send"):
                 if user_query.strip():
-                    with st.spinner("FinBot is thinking..."):
-                        transactions_text = account.format_transactions_for_ai()
-                        budget_tip = get_budget_insights(user_query, transactions_text)
-                        st.write(budget_tip)
+                    summary = account.financialSummary()
+                    # Targeted figures for the months/categories the question mentions
+                    context = retrieve_context(account, user_query)
+                    if hasattr(st, "write_stream"):
+                        # Show tokens as the model produces them
+                        st.write_stream(stream_budget_insights(user_query, summary, context))
+                    else:
+                        with st.spinner("FinBot is thinking..."):
+                            budget_tip = get_budget_insights(user_query, summary, context)
+                            st.write(budget_tip)
                 else: 
                     st.warning("Please enter a valid question.")
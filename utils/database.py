@@ -0,0 +1,198 @@
+import contextlib
+import json
+import os
+import queue
+import re
+import sqlite3
+import threading
+
+from utils.migrations import migrate as apply_migrations
+
+# Applied to every pooled connection. WAL lets readers run alongside the writer,
+# and synchronous=NORMAL only fsyncs at checkpoints instead of on every commit
+# (a power cut may lose the last commits, but never corrupts the file).
+DEFAULT_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "busy_timeout": 5000,          # ms to wait for another process's write lock
+    "cache_size": -16000,          # negative = KiB, i.e. a 16 MB page cache
+    "mmap_size": 64 * 1024 * 1024,
+}
+_PRAGMA_VALUE = re.compile(r"^-?\d+$|^[A-Za-z_]+$")
+# Read-only connections kept per database for queries outside transaction()
+READ_CONNECTIONS = int(os.environ.get("FINTRACK_SQLITE_READERS", 8))
+
+
+def configured_pragmas():
+    """
+    DEFAULT_PRAGMAS with overrides from FINTRACK_SQLITE_PRAGMAS (a JSON object);
+    FINTRACK_SQLITE_TUNING=0 disables tuning and keeps SQLite's defaults.
+    """
+    if os.environ.get("FINTRACK_SQLITE_TUNING", "1") == "0":
+        return {}
+    pragmas = dict(DEFAULT_PRAGMAS)
+    pragmas.update(json.loads(os.environ.get("FINTRACK_SQLITE_PRAGMAS", "{}")))
+    return pragmas
+
+
+class Database:
+    """
+    The SQLite connections for a database file, shared by every session.
+
+    Writes go through transaction() on one connection guarded by lock. Reads
+    go through reading(), which lends out one of up to readers extra
+    connections, so queries from different sessions (and different users of
+    the shared store) run side by side instead of queuing on the write lock;
+    under WAL they also run alongside a write. Streamlit runs every session's
+    script in its own thread, so connections are opened with
+    check_same_thread=False.
+    Table DDL is executed once per process via ensure_schema instead of on
+    every manager construction; versioned schemas go through migrate.
+    pragmas (configured_pragmas() by default) are applied when it opens.
+    """
+
+    def __init__(self, db_name, pragmas=None, readers=None):
+        self.db_name = db_name
+        self.conn = sqlite3.connect(db_name, check_same_thread=False)
+        self.lock = threading.RLock()
+        self._schemas = set()
+        self._depth = 0
+        self._local = threading.local()
+        self.pragmas = self.apply_pragmas(configured_pragmas() if pragmas is None else pragmas)
+        # An in-memory database exists only on its own connection
+        self.readers = 0 if db_name == ":memory:" else (READ_CONNECTIONS if readers is None else readers)
+        self._idle = queue.LifoQueue()
+        self._opened = []
+        self._readers_lock = threading.Lock()
+
+    @staticmethod
+    def _set_pragmas(conn, pragmas):
+        applied = {}
+        for name, value in pragmas.items():
+            if not re.match(r"^[a-z_]+$", name) or not _PRAGMA_VALUE.match(str(value)):
+                raise ValueError(f"Invalid pragma {name}={value!r}")
+            row = conn.execute(f"PRAGMA {name} = {value}").fetchone()
+            applied[name] = row[0] if row else conn.execute(f"PRAGMA {name}").fetchone()[0]
+        return applied
+
+    def apply_pragmas(self, pragmas):
+        """
+        Set each PRAGMA name = value on the write connection (read connections
+        get the same per-connection settings when they open).
+
+        Returns:
+            dict of the values SQLite reports back (journal_mode may stay
+            'memory' for in-memory databases, for example)
+        """
+        with self.lock:
+            return self._set_pragmas(self.conn, pragmas)
+
+    def _open_reader(self):
+        conn = sqlite3.connect(self.db_name, check_same_thread=False)
+        # journal_mode belongs to the file and was set by the write connection
+        self._set_pragmas(conn, {name: value for name, value in self.pragmas.items() if name != "journal_mode"})
+        return conn
+
+    def _borrow(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._readers_lock:
+            if len(self._opened) < self.readers:
+                conn = self._open_reader()
+                self._opened.append(conn)
+                return conn
+        return self._idle.get()
+
+    @contextlib.contextmanager
+    def reading(self):
+        """
+        A connection for read-only queries, seeing the last committed data.
+
+        Inside this thread's transaction() it is the write connection, so the
+        transaction's own uncommitted writes are visible.
+        """
+        if getattr(self._local, "depth", 0) or not self.readers:
+            with self.lock:
+                yield self.conn
+            return
+        conn = self._borrow()
+        try:
+            yield conn
+        finally:
+            self._idle.put(conn)
+
+    @contextlib.contextmanager
+    def transaction(self):
+        """
+        Hold the lock for a unit of writes and commit once, when the outermost
+        transaction() exits (rolling back if it raises). Nesting lets callers
+        batch several manager writes into a single commit.
+        """
+        with self.lock:
+            self._depth += 1
+            self._local.depth = self._depth
+            try:
+                yield self.conn
+                if self._depth == 1:
+                    self.conn.commit()
+            except BaseException:
+                if self._depth == 1:
+                    self.conn.rollback()
+                raise
+            finally:
+                self._depth -= 1
+                self._local.depth = self._depth
+
+    def ensure_schema(self, key, ddl):
+        """Run the DDL script for key the first time it is requested on this database."""
+        with self.lock:
+            if key in self._schemas:
+                return
+            self.conn.executescript(ddl)
+            self._schemas.add(key)
+
+    def migrate(self, migrations):
+        """Apply pending versioned migrations the first time they are requested in this process."""
+        with self.lock:
+            key = ("migrations", id(migrations))
+            if key in self._schemas:
+                return
+            apply_migrations(self.conn, migrations)
+            self._schemas.add(key)
+
+    def enable_wal(self):
+        """Switch the file to write-ahead logging so readers do not block the writer."""
+        with self.lock:
+            return self.conn.execute("PRAGMA journal_mode=WAL").fetchone()[0]
+
+    def close(self):
+        with self._readers_lock:
+            for conn in self._opened:
+                conn.close()
+            self._opened = []
+            self._idle = queue.LifoQueue()
+        with self.lock:
+            self.conn.close()
+
+
+_databases = {}
+_pool_lock = threading.Lock()
+
+
+def get_database(db_name):
+    """Return the process-wide Database for db_name, opening (and tuning) it on first use."""
+    with _pool_lock:
+        db = _databases.get(db_name)
+        if db is None:
+            db = _databases[db_name] = Database(db_name)
+        return db
+
+
+def close_all():
+    """Close and forget every pooled connection."""
+    with _pool_lock:
+        for db in _databases.values():
+            db.close()
+        _databases.clear()
@@ -1,105 +1,304 @@
-import sqlite3
+import datetime
+import json
+import uuid
 import pandas as pd
 import streamlit as st
+from utils.storage import as_storage
+from utils.export import export_snapshot, export_table
 
-class ExpenseManager:
+def _isoDate(value):
+    """Store dates as 'YYYY-MM-DD' text so they compare, sort and group correctly in SQL."""
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.strftime("%Y-%m-%d")
+    return value
 
-    def __init__(self, db_name):
 
-        self.db_name = db_name
-        self.conn = sqlite3.connect(self.db_name)
-        self.cursor = self.conn.cursor()
+def _nextMonth(month):
+    """'YYYY-MM' -> first day of the following month as 'YYYY-MM-DD'."""
+    year, number = int(month[:4]), int(month[5:7])
+    return f"{year + number // 12}-{number % 12 + 1:02d}-01"
+
+
+def _filterClause(label_column, start_date=None, end_date=None, labels=None, min_amount=None, max_amount=None,
+                  months=None, scope=None):
+    """
+    Build a WHERE clause and its parameters from optional transaction filters,
+    starting from scope, the (conditions, params) of Storage.scope().
+    months restricts rows to a list of 'YYYY-MM' months (not the span between them).
+    """
+    conditions, params = (list(scope[0]), list(scope[1])) if scope else ([], [])
+    if start_date is not None:
+        conditions.append("date >= ?")
+        params.append(_isoDate(start_date))
+    if end_date is not None:
+        conditions.append("date <= ?")
+        params.append(_isoDate(end_date))
+    if months:
+        # Half-open ranges per month keep the date index usable
+        conditions.append("(" + " OR ".join("(date >= ? AND date < ?)" for _ in months) + ")")
+        for month in months:
+            params.extend([f"{month}-01", _nextMonth(month)])
+    if labels:
+        conditions.append(f"{label_column} IN ({', '.join('?' * len(labels))})")
+        params.extend(labels)
+    if min_amount is not None:
+        conditions.append("amount >= ?")
+        params.append(float(min_amount))
+    if max_amount is not None:
+        conditions.append("amount <= ?")
+        params.append(float(max_amount))
+    where = " WHERE " + " AND ".join(conditions) if conditions else ""
+    return where, params
+
+
+def _idClause(record_id, scope):
+    """WHERE clause for one row by primary key, within scope."""
+    conditions, params = scope
+    return " WHERE " + " AND ".join(list(conditions) + ["id = ?"]), list(params) + [int(record_id)]
+
+
+def _orderClause(sort_by, descending, allowed):
+    """ORDER BY for a whitelisted column, with id as a stable tiebreaker."""
+    if sort_by not in allowed:
+        raise ValueError(f"Cannot sort by {sort_by!r}")
+    direction = "DESC" if descending else "ASC"
+    return f" ORDER BY {sort_by} {direction}, id {direction}"
+
+
+EXPENSE_SORT_COLUMNS = ("id", "date", "name", "amount", "category")
+INCOME_SORT_COLUMNS = ("id", "date", "name", "amount", "source")
+
+# Selected explicitly so the shared store's user_id column never reaches the UI
+EXPENSE_COLUMNS = "id, name, date, amount, category, description"
+INCOME_COLUMNS = "id, name, date, amount, source, description"
 
-        # Create the table if it doesn't exist
-        self.cursor.execute('''CREATE TABLE IF NOT EXISTS expenses (
-                                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                                name TEXT,
-                                date DATE,
-                                amount REAL,
-                                category TEXT,
-                                description TEXT)''')
-        self.conn.commit()
+
+class ExpenseManager:
+
+    def __init__(self, storage):
+        """storage is a utils.storage.Storage, or the path of a per-user database file."""
+        self.storage = as_storage(storage)
+        self.db = self.storage.db
+        self.db_name = self.db.db_name
+        self.conn = self.db.conn
+        self.cursor = self.conn.cursor()
 
     def addExpense(self, date, name, amount, category, description): #WHAT IS THIS? :(
-        self.cursor.execute('''INSERT INTO expenses (name, date, amount, category, description)
-                               VALUES (?, ?, ?, ?, ?)''', 
-                               (name, date, amount, category, description))
-        self.conn.commit()
+        with self.db.transaction():
+            self.cursor.execute(self.storage.insert_sql("expenses", ("name", "date", "amount", "category", "description")),
+                                self.storage.tag((name, _isoDate(date), amount, category, description)))
+
+    def addExpenses(self, rows, fingerprinted=False):
+        """
+        Insert many (date, name, amount, category, description) rows in one transaction.
+        With fingerprinted, each row carries a sixth fingerprint value and rows
+        whose fingerprint is already stored are ignored; returns the number inserted.
+        """
+        columns = ("date", "name", "amount", "category", "description") + (("fingerprint",) if fingerprinted else ())
+        with self.db.transaction():
+            self.cursor.executemany(self.storage.insert_sql("expenses", columns, or_ignore=fingerprinted),
+                                    self.storage.tag_rows(rows))
+            return self.cursor.rowcount
 
     def viewExpenses(self):
-        query = "SELECT * FROM expenses"
-        return pd.read_sql(query, self.conn)
+        where, params = _filterClause("category", scope=self.storage.scope())
+        query = f"SELECT {EXPENSE_COLUMNS} FROM expenses{where}"
+        with self.db.reading() as conn:
+            return pd.read_sql(query, conn, params=params)
+
+    def queryExpenses(self, start_date=None, end_date=None, categories=None, min_amount=None, max_amount=None,
+                      months=None, sort_by="id", descending=False, limit=50, offset=0):
+        """Fetch one page of expenses matching the filters, sorted and sliced in SQL."""
+        where, params = _filterClause("category", start_date, end_date, categories, min_amount, max_amount, months,
+                                      scope=self.storage.scope())
+        query = f"SELECT {EXPENSE_COLUMNS} FROM expenses{where}{_orderClause(sort_by, descending, EXPENSE_SORT_COLUMNS)} LIMIT ? OFFSET ?"
+        with self.db.reading() as conn:
+            return pd.read_sql(query, conn, params=params + [int(limit), int(offset)])
+
+    def countExpenses(self, start_date=None, end_date=None, categories=None, min_amount=None, max_amount=None,
+                      months=None):
+        where, params = _filterClause("category", start_date, end_date, categories, min_amount, max_amount, months,
+                                      scope=self.storage.scope())
+        with self.db.reading() as conn:
+            return conn.execute(f"SELECT COUNT(*) FROM expenses{where}", params).fetchone()[0]
+
+    def monthlyCategoryTotals(self, months=None):
+        """
+        Expense totals per (month, category) from the trigger-maintained rollup
+        table, optionally restricted to a list of 'YYYY-MM' months.
+        """
+        conditions, params = self.storage.scope()
+        if months:
+            conditions = conditions + [f"month IN ({', '.join('?' * len(months))})"]
+            params = params + list(months)
+        where = " WHERE " + " AND ".join(conditions) if conditions else ""
+        query = f"SELECT month, category, total AS amount, count FROM expense_monthly_category{where} ORDER BY month, category"
+        with self.db.reading() as conn:
+            return pd.read_sql(query, conn, params=params)
+
+    def totalExpenses(self, start_date=None, end_date=None, categories=None, min_amount=None, max_amount=None,
+                      months=None):
+        where, params = _filterClause("category", start_date, end_date, categories, min_amount, max_amount, months,
+                                      scope=self.storage.scope())
+        with self.db.reading() as conn:
+            return conn.execute(f"SELECT COALESCE(SUM(amount), 0) FROM expenses{where}", params).fetchone()[0]
 
     def deleteExpense(self, expense_id):
-        self.cursor.execute("DELETE FROM expenses WHERE id=?", (expense_id,))
-        self.conn.commit()
+        """Delete one row by primary key; returns its amount, or None if the id does not exist."""
+        where, params = _idClause(expense_id, self.storage.scope())
+        with self.db.transaction():
+            row = self.cursor.execute(f"SELECT amount FROM expenses{where}", params).fetchone()
+            if row is None:
+                return None
+            self.cursor.execute(f"DELETE FROM expenses{where}", params)
+        return row[0]
     
     def updateExpense(self, expense_id, date, name, amount, category, description):
-        self.cursor.execute('''UPDATE expenses 
-                               SET name=?, date=?, amount=?, category=?, description=?
-                               WHERE id=?''',
-                               (name, date, amount, category, description, expense_id))
-        self.conn.commit()
+        """Update one row by primary key; returns its previous amount, or None if the id does not exist."""
+        where, params = _idClause(expense_id, self.storage.scope())
+        with self.db.transaction():
+            row = self.cursor.execute(f"SELECT amount FROM expenses{where}", params).fetchone()
+            if row is None:
+                return None
+            self.cursor.execute(f'''UPDATE expenses 
+                                    SET name=?, date=?, amount=?, category=?, description=?{where}''',
+                                [name, _isoDate(date), amount, category, description] + params)
+        return row[0]
     
     def getExpenseById(self, expense_id):
-        query = f"SELECT * FROM expenses WHERE id={expense_id}"
-        result = pd.read_sql(query, self.conn)
+        where, params = _idClause(expense_id, self.storage.scope())
+        query = f"SELECT {EXPENSE_COLUMNS} FROM expenses{where}"
+        with self.db.reading() as conn:
+            result = pd.read_sql(query, conn, params=params)
         return result.iloc[0] if not result.empty else None
 
 
 class IncomeManager:
-    def __init__(self, db_name):
-        self.db_name = db_name
-        self.conn = sqlite3.connect(self.db_name)
+    def __init__(self, storage):
+        """storage is a utils.storage.Storage, or the path of a per-user database file."""
+        self.storage = as_storage(storage)
+        self.db = self.storage.db
+        self.db_name = self.db.db_name
+        self.conn = self.db.conn
         self.cursor = self.conn.cursor()
 
-        # Create the table if it doesn't exist
-        self.cursor.execute('''CREATE TABLE IF NOT EXISTS income (
-                                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                                name TEXT,
-                                date DATE,
-                                amount REAL,
-                                source TEXT,
-                                description TEXT)''')
-        self.conn.commit()
-
     def addIncome(self, date, name, amount, source, description):
-        self.cursor.execute('''INSERT INTO income (name, date, amount, source, description)
-                               VALUES (?, ?, ?, ?, ?)''', 
-                               (name, date, amount, source, description))
-        self.conn.commit()
+        with self.db.transaction():
+            self.cursor.execute(self.storage.insert_sql("income", ("name", "date", "amount", "source", "description")),
+                                self.storage.tag((name, _isoDate(date), amount, source, description)))
+
+    def addIncomes(self, rows, fingerprinted=False):
+        """
+        Insert many (date, name, amount, source, description) rows in one transaction.
+        With fingerprinted, each row carries a sixth fingerprint value and rows
+        whose fingerprint is already stored are ignored; returns the number inserted.
+        """
+        columns = ("date", "name", "amount", "source", "description") + (("fingerprint",) if fingerprinted else ())
+        with self.db.transaction():
+            self.cursor.executemany(self.storage.insert_sql("income", columns, or_ignore=fingerprinted),
+                                    self.storage.tag_rows(rows))
+            return self.cursor.rowcount
 
     def viewIncome(self):
-        query = "SELECT * FROM income"
-        return pd.read_sql(query, self.conn)
+        where, params = _filterClause("source", scope=self.storage.scope())
+        query = f"SELECT {INCOME_COLUMNS} FROM income{where}"
+        with self.db.reading() as conn:
+            return pd.read_sql(query, conn, params=params)
+
+    def queryIncome(self, start_date=None, end_date=None, sources=None, min_amount=None, max_amount=None,
+                    months=None, sort_by="id", descending=False, limit=50, offset=0):
+        """Fetch one page of income rows matching the filters, sorted and sliced in SQL."""
+        where, params = _filterClause("source", start_date, end_date, sources, min_amount, max_amount, months,
+                                      scope=self.storage.scope())
+        query = f"SELECT {INCOME_COLUMNS} FROM income{where}{_orderClause(sort_by, descending, INCOME_SORT_COLUMNS)} LIMIT ? OFFSET ?"
+        with self.db.reading() as conn:
+            return pd.read_sql(query, conn, params=params + [int(limit), int(offset)])
+
+    def countIncome(self, start_date=None, end_date=None, sources=None, min_amount=None, max_amount=None,
+                    months=None):
+        where, params = _filterClause("source", start_date, end_date, sources, min_amount, max_amount, months,
+                                      scope=self.storage.scope())
+        with self.db.reading() as conn:
+            return conn.execute(f"SELECT COUNT(*) FROM income{where}", params).fetchone()[0]
+
+    def monthlySourceTotals(self, months=None):
+        """
+        Income totals per (month, source) from the trigger-maintained rollup
+        table, optionally restricted to a list of 'YYYY-MM' months.
+        """
+        conditions, params = self.storage.scope()
+        if months:
+            conditions = conditions + [f"month IN ({', '.join('?' * len(months))})"]
+            params = params + list(months)
+        where = " WHERE " + " AND ".join(conditions) if conditions else ""
+        query = f"SELECT month, source, total AS amount, count FROM income_monthly_source{where} ORDER BY month, source"
+        with self.db.reading() as conn:
+            return pd.read_sql(query, conn, params=params)
+
+    def totalIncome(self, start_date=None, end_date=None, sources=None, min_amount=None, max_amount=None,
+                    months=None):
+        where, params = _filterClause("source", start_date, end_date, sources, min_amount, max_amount, months,
+                                      scope=self.storage.scope())
+        with self.db.reading() as conn:
+            return conn.execute(f"SELECT COALESCE(SUM(amount), 0) FROM income{where}", params).fetchone()[0]
 
     def deleteIncome(self, income_id):
-        self.cursor.execute("DELETE FROM income WHERE id=?", (income_id,))
-        self.conn.commit()
+        """Delete one row by primary key; returns its amount, or None if the id does not exist."""
+        where, params = _idClause(income_id, self.storage.scope())
+        with self.db.transaction():
+            row = self.cursor.execute(f"SELECT amount FROM income{where}", params).fetchone()
+            if row is None:
+                return None
+            self.cursor.execute(f"DELETE FROM income{where}", params)
+        return row[0]
     
     def updateIncome(self, income_id, date, name, amount, source, description):
-        self.cursor.execute('''UPDATE income 
-                               SET name=?, date=?, amount=?, source=?, description=?
-                               WHERE id=?''',
-                               (name, date, amount, source, description, income_id))
-        self.conn.commit()
+        """Update one row by primary key; returns its previous amount, or None if the id does not exist."""
+        where, params = _idClause(income_id, self.storage.scope())
+        with self.db.transaction():
+            row = self.cursor.execute(f"SELECT amount FROM income{where}", params).fetchone()
+            if row is None:
+                return None
+            self.cursor.execute(f'''UPDATE income 
+                                    SET name=?, date=?, amount=?, source=?, description=?{where}''',
+                                [name, _isoDate(date), amount, source, description] + params)
+        return row[0]
     
     def getIncomeById(self, income_id):
-        query = f"SELECT * FROM income WHERE id={income_id}"
-        result = pd.read_sql(query, self.conn)
+        where, params = _idClause(income_id, self.storage.scope())
+        query = f"SELECT {INCOME_COLUMNS} FROM income{where}"
+        with self.db.reading() as conn:
+            result = pd.read_sql(query, conn, params=params)
         return result.iloc[0] if not result.empty else None
 
 
 class Account:
-    def __init__(self, db_name):
-        self.IncomeManager = IncomeManager(db_name)
-        self.ExpenseManager = ExpenseManager(db_name)
+    def __init__(self, storage):
+        """storage is a utils.storage.Storage, or the path of a per-user database file."""
+        self.storage = as_storage(storage)
+        self.IncomeManager = IncomeManager(self.storage)
+        self.ExpenseManager = ExpenseManager(self.storage)
+        self.db = self.storage.db
         self.Balance = 0.0  
 
     def getBalance(self):
-        total_income = self.IncomeManager.viewIncome()["amount"].sum()
-        total_expense = self.ExpenseManager.viewExpenses()["amount"].sum()
-        self.Balance = total_income - total_expense
+        """Read the balance from the trigger-maintained ledger row (O(1) in history size)."""
+        where, params = self.storage.ledger_where()
+        with self.db.reading() as conn:
+            row = conn.execute(f"SELECT total_income - total_expense FROM balance{where}", params).fetchone()
+        self.Balance = row[0] if row else self.rebuildBalance()
+        return self.Balance
+
+    def rebuildBalance(self):
+        """Recompute the ledger from SUM queries over the income and expenses tables."""
+        column, value = self.storage.ledger_key()
+        where, params = _filterClause(None, scope=self.storage.scope())
+        with self.db.transaction():
+            self.db.conn.execute(f'''INSERT OR REPLACE INTO balance ({column}, total_income, total_expense) VALUES (?,
+                                         (SELECT COALESCE(SUM(amount), 0) FROM income{where}),
+                                         (SELECT COALESCE(SUM(amount), 0) FROM expenses{where}))''',
+                                 [value] + params + params)
+        self.Balance = self.IncomeManager.totalIncome() - self.ExpenseManager.totalExpenses()
         return self.Balance
 
     def addExpense(self, date, name, amount, category, description):
@@ -112,6 +311,285 @@ class Account:
         self.Balance += amount
         st.success(f"Income added successfully!")
 
+    def knownFingerprints(self, fingerprints):
+        """
+        The subset of fingerprints already stored on this account's expenses or
+        income, found with one indexed lookup against the batch (passed as a
+        JSON array) instead of a query per row.
+        """
+        conditions, params = self.storage.scope()
+        scope = "".join(f" AND {condition}" for condition in conditions)
+        batch = json.dumps(list(fingerprints))
+        with self.db.reading() as conn:
+            rows = conn.execute(f'''SELECT fingerprint FROM expenses
+                                       WHERE fingerprint IN (SELECT value FROM json_each(?)){scope}
+                                   UNION
+                                   SELECT fingerprint FROM income
+                                       WHERE fingerprint IN (SELECT value FROM json_each(?)){scope}''',
+                                [batch, *params, batch, *params]).fetchall()
+        return {row[0] for row in rows}
+
+    def _importRows(self, transactions, unknown_as=None, default_expense_category="Miscellaneous",
+                    default_income_source="Other", name="", description="", duplicates="skip"):
+        """
+        Turn a statement DataFrame into expense and income rows for insertion
+        (see importTransactions). Only the duplicate lookup touches the database.
+
+        Returns:
+            (expense_rows, income_rows, fingerprinted, amounts, is_income, n_duplicates)
+        """
+        amounts = pd.to_numeric(transactions["amount"], errors="coerce").abs()
+        direction = transactions["direction"].where(transactions["direction"].isin(["debit", "credit"]), "unknown")
+        if unknown_as in ("debit", "credit"):
+            direction = direction.replace("unknown", unknown_as)
+        keep = amounts.notna() & (direction != "unknown")
+
+        fingerprinted = "fingerprint" in transactions.columns
+        n_duplicates = 0
+        if fingerprinted:
+            fingerprints = transactions["fingerprint"].where(keep)
+            is_duplicate = fingerprints.isin(self.knownFingerprints(fingerprints[keep].tolist()))
+            n_duplicates = int(is_duplicate.sum())
+            if duplicates == "skip":
+                keep &= ~is_duplicate
+            else:
+                # Stored without a fingerprint so the unique index accepts the second copy
+                fingerprints = fingerprints.mask(is_duplicate, None)
+            fingerprints = fingerprints[keep].astype(object)
+            fingerprints = fingerprints.where(fingerprints.notna(), None)
+
+        amounts = amounts[keep].astype(float)
+        direction = direction[keep]
+
+        today = datetime.date.today().isoformat()
+        if "date" in transactions.columns:
+            dates = pd.to_datetime(transactions.loc[keep, "date"], errors="coerce", format="mixed")
+            dates = dates.dt.strftime("%Y-%m-%d").fillna(today)
+        else:
+            dates = pd.Series(today, index=amounts.index)
+
+        categories = transactions.loc[keep, "category"].astype(str).str.slice(0, 200)
+        categories = categories.mask(categories.str.strip().isin(["", "nan", "None"]), default_expense_category)
+        names = pd.Series(name.strip(), index=amounts.index) if name.strip() else categories
+
+        is_expense = (direction == "debit").to_numpy()
+        is_income = ~is_expense
+
+        expense_columns = [dates[is_expense].tolist(), names[is_expense].tolist(), amounts[is_expense].tolist(),
+                           categories[is_expense].tolist(), [description] * int(is_expense.sum())]
+        income_columns = [dates[is_income].tolist(), names[is_income].tolist(), amounts[is_income].tolist(),
+                          [default_income_source] * int(is_income.sum()), [description] * int(is_income.sum())]
+        if fingerprinted:
+            expense_columns.append(fingerprints[is_expense].tolist())
+            income_columns.append(fingerprints[is_income].tolist())
+        return (list(zip(*expense_columns)), list(zip(*income_columns)), fingerprinted, amounts, is_income,
+                n_duplicates)
+
+    @staticmethod
+    def _importSummary(total, added_expenses, added_income, n_duplicates, duplicates):
+        added = added_expenses + added_income
+        return {
+            "added": added,
+            "expenses": added_expenses,
+            "income": added_income,
+            "skipped": total - added - (n_duplicates if duplicates == "skip" else 0),
+            "duplicates": n_duplicates,
+        }
+
+    def importTransactions(self, transactions, unknown_as=None, default_expense_category="Miscellaneous",
+                           default_income_source="Other", name="", description="", duplicates="skip"):
+        """
+        Bulk-import a statement DataFrame with 'amount', 'direction', 'category'
+        and optional 'date' and 'fingerprint' columns. Rows are prepared
+        column-wise and written with one executemany per table, both inside a
+        single transaction.
+
+        Args:
+            transactions: DataFrame of parsed statement rows
+            unknown_as: 'debit', 'credit' or None to skip rows with unknown direction
+            name: title for every row; falls back to the row's category when empty
+            description: description stored with every row
+            duplicates: 'skip' leaves out rows whose fingerprint is already stored;
+                'keep' imports them anyway (untagged) and only counts them
+
+        Returns:
+            dict with 'added', 'expenses', 'income', 'skipped' and 'duplicates' counts
+        """
+        expense_rows, income_rows, fingerprinted, amounts, is_income, n_duplicates = self._importRows(
+            transactions, unknown_as, default_expense_category, default_income_source, name, description, duplicates)
+
+        # Both tables are written under one commit
+        added_expenses = added_income = 0
+        with self.db.transaction():
+            if expense_rows:
+                added_expenses = self.ExpenseManager.addExpenses(expense_rows, fingerprinted)
+            if income_rows:
+                added_income = self.IncomeManager.addIncomes(income_rows, fingerprinted)
+
+        if added_expenses == len(expense_rows) and added_income == len(income_rows):
+            self.Balance += amounts[is_income].sum() - amounts[~is_income].sum()
+        else:
+            # A concurrent import stored some of these fingerprints first; those rows were ignored
+            n_duplicates += len(expense_rows) + len(income_rows) - added_expenses - added_income
+            self.getBalance()
+
+        return self._importSummary(len(transactions), added_expenses, added_income, n_duplicates, duplicates)
+
+    def importTransactionChunks(self, chunks, progress=None, **kwargs):
+        """
+        Import an iterable of prepared statement frames (see
+        utils.statements.prepare_transactions) chunk by chunk, so a failure
+        part-way leaves the account unchanged.
+
+        Reading, categorizing and preparing each chunk happen without the
+        database lock, which the shared store holds for every user's queries.
+        Chunks are collected in a temporary staging table, holding the lock only
+        for each chunk's insert, and moved into the ledger in one transaction
+        at the end.
+
+        Args:
+            chunks: iterable of DataFrames accepted by importTransactions
+            progress: optional callback receiving the running summary after each
+                chunk; exceptions it raises (e.g. a cancellation) abort the import
+            **kwargs: passed to importTransactions
+
+        Returns:
+            dict with the summed 'added', 'expenses', 'income', 'skipped' and 'duplicates' counts
+        """
+        duplicates = kwargs.get("duplicates", "skip")
+        totals = {"added": 0, "expenses": 0, "income": 0, "skipped": 0, "duplicates": 0}
+        conn = self.db.conn
+        # Temp tables belong to the connection every session shares, so each import gets its own
+        stage = f"temp.import_stage_{uuid.uuid4().hex}"
+        with self.db.transaction():
+            conn.execute(f"CREATE TABLE {stage} (kind TEXT, date TEXT, name TEXT, amount REAL, label TEXT, "
+                         f"description TEXT, fingerprint TEXT)")
+        try:
+            fingerprinted = False
+            for chunk in chunks:
+                expense_rows, income_rows, chunk_fingerprinted, _, _, n_duplicates = self._importRows(chunk, **kwargs)
+                fingerprinted |= chunk_fingerprinted
+                staged = [("expense", *row) for row in expense_rows] + [("income", *row) for row in income_rows]
+                if not chunk_fingerprinted:
+                    staged = [row + (None,) for row in staged]
+                with self.db.transaction():
+                    conn.executemany(f"INSERT INTO {stage} VALUES (?, ?, ?, ?, ?, ?, ?)", staged)
+                summary = self._importSummary(len(chunk), len(expense_rows), len(income_rows), n_duplicates, duplicates)
+                for key, count in summary.items():
+                    totals[key] += count
+                if progress is not None:
+                    progress(totals)
+
+            with self.db.transaction():
+                added = {}
+                for kind, table, label in (("expense", "expenses", "category"), ("income", "income", "source")):
+                    sql = self.storage.insert_select_sql(
+                        table, ("date", "name", "amount", label, "description", "fingerprint"),
+                        ("date", "name", "amount", "label", "description", "fingerprint"),
+                        f"{stage} WHERE kind = '{kind}' ORDER BY rowid", or_ignore=fingerprinted)
+                    added[kind] = conn.execute(sql, self.storage.tag(())).rowcount
+        finally:
+            with self.db.transaction():
+                conn.execute(f"DROP TABLE IF EXISTS {stage}")
+
+        # Rows a concurrent import stored first were ignored by the unique fingerprint index
+        ignored = totals["expenses"] + totals["income"] - added["expense"] - added["income"]
+        totals.update(added=added["expense"] + added["income"], expenses=added["expense"], income=added["income"])
+        totals["duplicates"] += ignored
+        if duplicates != "skip":
+            totals["skipped"] += ignored
+        self.getBalance()
+        return totals
+
+    def expensePage(self, page=1, page_size=50, sort_by="id", descending=False, **filters):
+        """
+        Return (rows, total) for one page of expenses, where total counts every
+        row matching filters (start_date, end_date, categories, min_amount, max_amount).
+        Pages past the end are clamped to the last page.
+        """
+        total = self.ExpenseManager.countExpenses(**filters)
+        # Clamp to the last page so a narrowed filter never yields an empty page
+        page = min(max(page, 1), max(1, -(-total // page_size)))
+        rows = self.ExpenseManager.queryExpenses(sort_by=sort_by, descending=descending, limit=page_size,
+                                                 offset=(page - 1) * page_size, **filters)
+        return rows, total
+
+    def incomePage(self, page=1, page_size=50, sort_by="id", descending=False, **filters):
+        """
+        Return (rows, total) for one page of income, where total counts every
+        row matching filters (start_date, end_date, sources, min_amount, max_amount).
+        Pages past the end are clamped to the last page.
+        """
+        total = self.IncomeManager.countIncome(**filters)
+        # Clamp to the last page so a narrowed filter never yields an empty page
+        page = min(max(page, 1), max(1, -(-total // page_size)))
+        rows = self.IncomeManager.queryIncome(sort_by=sort_by, descending=descending, limit=page_size,
+                                              offset=(page - 1) * page_size, **filters)
+        return rows, total
+
+    def exportSnapshot(self, directory, fmt="parquet", compression="zstd"):
+        """
+        Write expenses and income to Parquet or Arrow IPC files in directory,
+        streamed in batches from one consistent read (see utils.export).
+
+        Returns:
+            the snapshot manifest dict
+        """
+        return export_snapshot(self.storage, directory, fmt, compression)
+
+    def exportTable(self, table, sink, fmt="parquet", compression="zstd"):
+        """Stream 'expenses' or 'income' to a path or binary file object; returns the row count."""
+        return export_table(self.storage, table, sink, fmt, compression)
+
+    def dataVersion(self):
+        """Counter bumped by every insert, update and delete on this account's tables."""
+        where, params = self.storage.ledger_where()
+        with self.db.reading() as conn:
+            row = conn.execute(f"SELECT version FROM data_version{where}", params).fetchone()
+        return row[0] if row else 0
+
+    def monthlyTotals(self):
+        """Income and expense totals per month, read from the rollup tables."""
+        where, params = _filterClause(None, scope=self.storage.scope())
+        with self.db.reading() as conn:
+            return pd.read_sql(f"SELECT month, income, expense FROM monthly_totals{where} ORDER BY month",
+                               conn, params=params)
+
+    def financialSummary(self):
+        """
+        Compact month-by-month aggregates for FinBot, read from the rollup and
+        balance tables, so its size depends on months and categories only.
+
+        Returns:
+            dict with 'total_income', 'total_expense' and 'months', a list of
+            {'month': 'YYYY-MM', 'income', 'expense', 'categories': {category: amount}}
+            ordered newest first
+        """
+        expense_rollup = self.ExpenseManager.monthlyCategoryTotals()
+        income_rollup = self.IncomeManager.monthlySourceTotals()
+        where, params = self.storage.ledger_where()
+        with self.db.reading() as conn:
+            row = conn.execute(f"SELECT total_income, total_expense FROM balance{where}", params).fetchone()
+        # A user in the shared store has no ledger row until their first write
+        total_income, total_expense = row if row else (0.0, 0.0)
+
+        months = {}
+        # Rows with unparseable dates only count toward the overall totals
+        for month, category, amount in expense_rollup.loc[expense_rollup["month"] != "unknown",
+                                                          ["month", "category", "amount"]].itertuples(index=False):
+            entry = months.setdefault(month, {"income": 0.0, "expense": 0.0, "categories": {}})
+            entry["expense"] += amount
+            entry["categories"][category] = entry["categories"].get(category, 0.0) + amount
+        for month, amount in income_rollup.loc[income_rollup["month"] != "unknown",
+                                               ["month", "amount"]].itertuples(index=False):
+            months.setdefault(month, {"income": 0.0, "expense": 0.0, "categories": {}})["income"] += amount
+
+        return {
+            "total_income": total_income,
+            "total_expense": total_expense,
+            "months": [{"month": month, **months[month]} for month in sorted(months, reverse=True)],
+        }
+
     def expenseList(self):
         return self.ExpenseManager.viewExpenses()
 
@@ -119,54 +597,38 @@ class Account:
         return self.IncomeManager.viewIncome()
 
     def deleteExpense(self, expense_id):
-        expenses = self.ExpenseManager.viewExpenses()
-        if expenses.empty:
-            st.warning("No expenses to delete.")
-            return
-
-        if expense_id in expenses["id"].values:
-            amount = expenses.loc[expenses["id"] == expense_id, "amount"].iloc[0]
-            self.ExpenseManager.deleteExpense(expense_id)
-            self.Balance += amount
-            st.success(f"Expense {expense_id} deleted successfully!")
-        else:
+        amount = self.ExpenseManager.deleteExpense(expense_id)
+        if amount is None:
             st.warning(f"Invalid Expense ID: {expense_id}")
-
-    def deleteIncome(self, income_id):
-        incomes = self.IncomeManager.viewIncome()
-        if incomes.empty:
-            st.warning("No income records to delete.")
             return
+        self.Balance += amount
+        st.success(f"Expense {expense_id} deleted successfully!")
 
-        if income_id in incomes["id"].values:
-            amount = incomes.loc[incomes["id"] == income_id, "amount"].iloc[0]
-            self.IncomeManager.deleteIncome(income_id)
-            self.Balance -= amount
-            st.success(f"Income {income_id} deleted successfully!")
-        else:
+    def deleteIncome(self, income_id):
+        amount = self.IncomeManager.deleteIncome(income_id)
+        if amount is None:
             st.warning(f"Invalid Income ID: {income_id}")
+            return
+        self.Balance -= amount
+        st.success(f"Income {income_id} deleted successfully!")
     
     def updateExpense(self, expense_id, date, name, amount, category, description):
-        expenses = self.ExpenseManager.viewExpenses()
-        if expense_id in expenses["id"].values:
-            old_amount = expenses.loc[expenses["id"] == expense_id, "amount"].iloc[0]
-            self.ExpenseManager.updateExpense(expense_id, date, name, amount, category, description)
-            # Adjust balance: add back old amount, subtract new amount
-            self.Balance = self.Balance + old_amount - amount
-            st.success(f"Expense {expense_id} updated successfully!")
-        else:
+        old_amount = self.ExpenseManager.updateExpense(expense_id, date, name, amount, category, description)
+        if old_amount is None:
             st.warning(f"Invalid Expense ID: {expense_id}")
+            return
+        # Adjust balance: add back old amount, subtract new amount
+        self.Balance = self.Balance + old_amount - amount
+        st.success(f"Expense {expense_id} updated successfully!")
     
     def updateIncome(self, income_id, date, name, amount, source, description):
-        incomes = self.IncomeManager.viewIncome()
-        if income_id in incomes["id"].values:
-            old_amount = incomes.loc[incomes["id"] == income_id, "amount"].iloc[0]
-            self.IncomeManager.updateIncome(income_id, date, name, amount, source, description)
-            # Adjust balance: subtract old amount, add new amount
-            self.Balance = self.Balance - old_amount + amount
-            st.success(f"Income {income_id} updated successfully!")
-        else:
+        old_amount = self.IncomeManager.updateIncome(income_id, date, name, amount, source, description)
+        if old_amount is None:
             st.warning(f"Invalid Income ID: {income_id}")
+            return
+        # Adjust balance: subtract old amount, add new amount
+        self.Balance = self.Balance - old_amount + amount
+        st.success(f"Income {income_id} updated successfully!")
     
     def getExpenseById(self, expense_id):
         return self.ExpenseManager.getExpenseById(expense_id)
@@ -189,4 +651,17 @@ class Account:
             'expenses': formatted_expenses
         }
         
-        return transactions
\ No newline at end of file
+        return transactions
+
+
+def get_account(storage):
+    """
+    Return this session's Account for storage (a Storage or a per-user database
+    path), creating it on the first run. The managers underneath share one
+    pooled connection per database file.
+    """
+    storage = as_storage(storage)
+    accounts = st.session_state.setdefault("accounts", {})
+    if storage.key not in accounts:
+        accounts[storage.key] = Account(storage)
+    return accounts[storage.key]
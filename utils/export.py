@@ -0,0 +1,204 @@
+import datetime
+import json
+import os
+import sqlite3
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.ipc as ipc
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+FORMATS = {"parquet": ".parquet", "arrow": ".arrow"}
+DEFAULT_COMPRESSION = "zstd"
+# Rows fetched from SQLite and written per record batch
+EXPORT_BATCH_ROWS = 50_000
+MANIFEST = "snapshot.json"
+
+TABLES = {"expenses": "category", "income": "source"}
+
+
+def _require_pyarrow():
+    if not PYARROW_AVAILABLE:
+        raise ImportError("Exports need the optional pyarrow package: pip install pyarrow")
+
+
+def table_schema(table, version=None):
+    """Arrow schema for an exported ledger table, with typed date and amount columns."""
+    metadata = {b"fintrack.table": table.encode()}
+    if version is not None:
+        metadata[b"fintrack.data_version"] = str(version).encode()
+    return pa.schema([
+        ("id", pa.int64()),
+        ("name", pa.string()),
+        ("date", pa.date32()),
+        ("amount", pa.float64()),
+        (TABLES[table], pa.string()),
+        ("description", pa.string()),
+    ], metadata=metadata)
+
+
+def _record_batch(rows, schema):
+    ids, names, dates, amounts, labels, descriptions = zip(*rows)
+    # Dates are stored as 'YYYY-MM-DD' text; anything unparseable becomes null
+    date_strings = pa.array([d if isinstance(d, str) else None for d in dates], pa.string())
+    parsed = pc.strptime(date_strings, format="%Y-%m-%d", unit="s", error_is_null=True)
+    return pa.record_batch([
+        pa.array(ids, pa.int64()),
+        pa.array([n if n is None else str(n) for n in names], pa.string()),
+        parsed.cast(pa.date32()),
+        pa.array([a if isinstance(a, (int, float)) else None for a in amounts], pa.float64()),
+        pa.array([v if v is None else str(v) for v in labels], pa.string()),
+        pa.array([v if v is None else str(v) for v in descriptions], pa.string()),
+    ], schema=schema)
+
+
+def _open_writer(sink, schema, fmt, compression):
+    if fmt == "parquet":
+        return pq.ParquetWriter(sink, schema, compression=compression)
+    if fmt == "arrow":
+        return ipc.new_file(sink, schema, options=ipc.IpcWriteOptions(compression=compression))
+    raise ValueError(f"Unknown export format {fmt!r}; expected one of {sorted(FORMATS)}")
+
+
+def _write_table(conn, storage, table, sink, fmt, compression, batch_rows, version):
+    conditions, params = storage.scope()
+    where = " WHERE " + " AND ".join(conditions) if conditions else ""
+    schema = table_schema(table, version)
+    cursor = conn.execute(f"SELECT id, name, date, amount, {TABLES[table]}, description "
+                          f"FROM {table}{where} ORDER BY id", params)
+    written = 0
+    writer = _open_writer(sink, schema, fmt, compression)
+    try:
+        while True:
+            rows = cursor.fetchmany(batch_rows)
+            if not rows:
+                break
+            writer.write_batch(_record_batch(rows, schema))
+            written += len(rows)
+    finally:
+        writer.close()
+    return written
+
+
+def _read_connection(storage):
+    """
+    A separate connection for the export, so a long read never holds the shared
+    connection's lock; under WAL its transaction is a consistent snapshot that
+    does not block writers.
+    """
+    conn = sqlite3.connect(storage.db.db_name)
+    conn.execute("BEGIN")
+    return conn
+
+
+def _data_version(conn, storage):
+    where, params = storage.ledger_where()
+    row = conn.execute(f"SELECT version FROM data_version{where}", params).fetchone()
+    return row[0] if row else 0
+
+
+def export_table(storage, table, sink, fmt="parquet", compression=DEFAULT_COMPRESSION, batch_rows=EXPORT_BATCH_ROWS):
+    """
+    Stream one ledger table ('expenses' or 'income') to sink, a path or a
+    writable binary file object, in record batches of batch_rows.
+
+    Returns:
+        the number of rows written
+    """
+    _require_pyarrow()
+    conn = _read_connection(storage)
+    try:
+        return _write_table(conn, storage, table, sink, fmt, compression, batch_rows, _data_version(conn, storage))
+    finally:
+        conn.close()
+
+
+def export_snapshot(storage, directory, fmt="parquet", compression=DEFAULT_COMPRESSION,
+                    batch_rows=EXPORT_BATCH_ROWS):
+    """
+    Write both ledger tables from one read transaction into directory, plus a
+    snapshot.json manifest recording the format, row counts and data version.
+
+    Returns:
+        the manifest dict
+    """
+    _require_pyarrow()
+    os.makedirs(directory, exist_ok=True)
+    conn = _read_connection(storage)
+    try:
+        version = _data_version(conn, storage)
+        rows = {table: _write_table(conn, storage, table, os.path.join(directory, table + FORMATS[fmt]),
+                                    fmt, compression, batch_rows, version)
+                for table in TABLES}
+    finally:
+        conn.close()
+
+    manifest = {
+        "format": fmt,
+        "compression": compression,
+        "data_version": version,
+        "user_id": storage.user_id,
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "rows": rows,
+    }
+    with open(os.path.join(directory, MANIFEST), "w") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def read_table(source):
+    """
+    Read an exported table back as an Arrow Table from a path or binary file
+    object (e.g. an upload); Arrow IPC files on disk are memory-mapped.
+    """
+    _require_pyarrow()
+    name = source if isinstance(source, str) else getattr(source, "name", "")
+    if name.endswith(FORMATS["arrow"]):
+        if isinstance(source, str):
+            with pa.memory_map(source) as mapped:
+                return ipc.open_file(mapped).read_all()
+        return ipc.open_file(source).read_all()
+    return pq.read_table(source)
+
+
+def read_table_files(sources):
+    """
+    Load exported table files (paths or file objects), telling expenses from
+    income by the table name stored in each file's schema metadata.
+
+    Returns:
+        dict with 'expenses' and 'income' DataFrames like read_snapshot's;
+        a table missing from sources is empty
+    """
+    snapshot = {}
+    for source in sources:
+        table = read_table(source)
+        name = (table.schema.metadata or {}).get(b"fintrack.table", b"").decode()
+        if name not in TABLES:
+            raise ValueError(f"{getattr(source, 'name', source)} is not a FinTrack export")
+        snapshot[name] = table.to_pandas(date_as_object=False)
+    for name in TABLES:
+        if name not in snapshot:
+            snapshot[name] = table_schema(name).empty_table().to_pandas(date_as_object=False)
+    return snapshot
+
+
+def read_snapshot(directory):
+    """
+    Load a snapshot written by export_snapshot.
+
+    Returns:
+        dict with the 'manifest' and 'expenses' / 'income' DataFrames
+        (dates as datetime64, null where the stored date was invalid)
+    """
+    with open(os.path.join(directory, MANIFEST)) as f:
+        manifest = json.load(f)
+    snapshot = {"manifest": manifest}
+    for table in TABLES:
+        path = os.path.join(directory, table + FORMATS[manifest["format"]])
+        snapshot[table] = read_table(path).to_pandas(date_as_object=False)
+    return snapshot
@@ -1,4 +1,17 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
 import traceback
+from datetime import datetime
+
+from utils.database import get_database
+from utils.llm_gateway import LLMGateway
+
+logger = logging.getLogger(__name__)
 
 try:
     import ollama
@@ -7,160 +20,477 @@ except ImportError:
     OLLAMA_AVAILABLE = False
 
 
-def get_budget_insights(user_query, transactions_text):
+def summarize_transactions(transactions_text):
     """
-    Get budget or expense insights using Ollama local model.
-    Falls back to local summary if Ollama is unavailable.
-    
-    The transactions_text is already loaded from the user's .db file via Account.format_transactions_for_ai()
-    so we don't need to load it again here.
+    Build the compact summary structure (see Account.financialSummary) from the
+    older {'income': [...], 'expenses': [...]} transaction lists.
     """
-    from datetime import datetime
-    
-    # Format transaction data in a cleaner way
     tx = transactions_text if isinstance(transactions_text, dict) else {}
     incomes = tx.get("income", []) if isinstance(tx, dict) else []
     expenses = tx.get("expenses", []) if isinstance(tx, dict) else []
-    
-    if not incomes and not expenses:
-        return "No financial data available. Please add some income or expenses to get started."
-    
-    # Parse dates and organize by month
-    monthly_data = {}
-    
-    for exp in expenses:
-        try:
-            date_str = exp.get('date', '')
-            date_obj = datetime.strptime(str(date_str), '%Y-%m-%d')
-            month_key = date_obj.strftime('%B %Y')  # e.g., "July 2025"
-            
-            if month_key not in monthly_data:
-                monthly_data[month_key] = {
-                    'expenses': [], 
-                    'income': [], 
-                    'total_expense': 0, 
-                    'total_income': 0, 
-                    'categories': {}
-                }
-            
-            amount = float(exp.get('amount', 0))
-            category = exp.get('category', 'Miscellaneous')
-            monthly_data[month_key]['expenses'].append(exp)
-            monthly_data[month_key]['total_expense'] += amount
-            monthly_data[month_key]['categories'][category] = monthly_data[month_key]['categories'].get(category, 0) + amount
-        except Exception as e:
-            print(f"Error parsing expense: {e}")
-            pass
-    
-    for inc in incomes:
-        try:
-            date_str = inc.get('date', '')
-            date_obj = datetime.strptime(str(date_str), '%Y-%m-%d')
-            month_key = date_obj.strftime('%B %Y')
-            
-            if month_key not in monthly_data:
-                monthly_data[month_key] = {
-                    'expenses': [], 
-                    'income': [], 
-                    'total_expense': 0, 
-                    'total_income': 0, 
-                    'categories': {}
-                }
-            
-            amount = float(inc.get('amount', 0))
-            monthly_data[month_key]['income'].append(inc)
-            monthly_data[month_key]['total_income'] += amount
-        except Exception as e:
-            print(f"Error parsing income: {e}")
-            pass
-    
-    # Build month-by-month summary
-    total_income = sum(float(i.get("amount", 0)) for i in incomes)
-    total_expense = sum(float(e.get("amount", 0)) for e in expenses)
-    
-    summary = f"Overall Total: Income ₹{total_income:.2f}, Expenses ₹{total_expense:.2f}\n\n"
-    summary += "Month-by-Month Breakdown:\n"
-    
-    for month, data in sorted(monthly_data.items(), reverse=True):
-        summary += f"\n{month}:\n"
-        summary += f"  Income: ₹{data['total_income']:.2f}\n"
-        summary += f"  Expenses: ₹{data['total_expense']:.2f}\n"
-        
-        if data['categories']:
-            summary += "  Spending by category:\n"
-            for cat, amt in sorted(data['categories'].items(), key=lambda x: x[1], reverse=True):
-                summary += f"    - {cat}: ₹{amt:.2f}\n"
-    
+
+    months = {}
+    for rows, kind in ((expenses, "expense"), (incomes, "income")):
+        for row in rows:
+            try:
+                month = datetime.strptime(str(row.get('date', '')), '%Y-%m-%d').strftime('%Y-%m')
+                amount = float(row.get('amount', 0))
+            except Exception as e:
+                print(f"Error parsing {kind}: {e}")
+                continue
+            entry = months.setdefault(month, {'income': 0.0, 'expense': 0.0, 'categories': {}})
+            entry[kind] += amount
+            if kind == "expense":
+                category = row.get('category', 'Miscellaneous')
+                entry['categories'][category] = entry['categories'].get(category, 0) + amount
+
+    return {
+        'total_income': sum(float(i.get("amount", 0)) for i in incomes),
+        'total_expense': sum(float(e.get("amount", 0)) for e in expenses),
+        'months': [{'month': month, **months[month]} for month in sorted(months, reverse=True)],
+    }
+
+
+def month_label(month):
+    """'2025-07' -> 'July 2025'."""
+    return datetime.strptime(month, '%Y-%m').strftime('%B %Y')
+
+
+# Upper bound on the (estimated) tokens spent on the financial summary in a prompt
+PROMPT_TOKEN_BUDGET = int(os.environ.get("FINBOT_PROMPT_TOKENS", 600))
+
+# Compaction levels tried in order until the summary fits the budget:
+# (months shown in detail, categories listed per period, roll older months into quarters)
+_COMPACTION_LEVELS = [
+    (6, 5, True),
+    (3, 5, True),
+    (3, 3, False),
+    (1, 3, False),
+    (1, 1, False),
+]
+
+
+def estimate_tokens(text):
+    """Rough token count: words, numbers and punctuation marks each count as one."""
+    return len(re.findall(r"\w+|[^\w\s]", text))
+
+
+def _period_totals(months, period_of):
+    """Merge month entries into periods (e.g. quarters), newest first."""
+    periods = {}
+    for data in months:
+        entry = periods.setdefault(period_of(data['month']), {'income': 0.0, 'expense': 0.0, 'categories': {}})
+        entry['income'] += data['income']
+        entry['expense'] += data['expense']
+        for cat, amt in data['categories'].items():
+            entry['categories'][cat] = entry['categories'].get(cat, 0) + amt
+    return list(periods.items())
+
+
+def _quarter(month):
+    year, mon = month.split('-')
+    return f"Q{(int(mon) - 1) // 3 + 1} {year}"
+
+
+def _period_lines(label, data, top_n):
+    lines = [f"\n{label}:\n", f"  Income: ₹{data['income']:.2f}\n", f"  Expenses: ₹{data['expense']:.2f}\n"]
+    if data['categories']:
+        ranked = sorted(data['categories'].items(), key=lambda x: x[1], reverse=True)
+        lines.append("  Spending by category:\n")
+        for cat, amt in ranked[:top_n]:
+            lines.append(f"    - {cat}: ₹{amt:.2f}\n")
+        rest = sum(amt for _, amt in ranked[top_n:])
+        if rest:
+            lines.append(f"    - other categories: ₹{rest:.2f}\n")
+    return "".join(lines)
+
+
+def build_summary_text(summary, token_budget=None):
+    """
+    Render the summary that goes into the FinBot prompt.
+
+    Without a budget every month is listed with every category. With one,
+    recent months stay in detail, older months are rolled into quarterly and
+    then yearly totals and only the top categories are named, stepping down
+    through _COMPACTION_LEVELS until the estimated token count fits.
+    """
+    total_income = summary['total_income']
+    total_expense = summary['total_expense']
+    months = summary['months']
+
+    header = f"Overall Total: Income ₹{total_income:.2f}, Expenses ₹{total_expense:.2f}\n\n"
     # Calculate overall spending percentage
     spending_ratio = (total_expense / total_income * 100) if total_income > 0 else 0
-    summary += f"\nOverall spending: {spending_ratio:.1f}% of income\n"
-    
-    prompt = f"""Question: {user_query}
+    footer = f"\nOverall spending: {spending_ratio:.1f}% of income\n"
+
+    if token_budget is None:
+        body = "Month-by-Month Breakdown:\n" + "".join(
+            _period_lines(month_label(data['month']), data, len(data['categories'])) for data in months)
+        return header + body + footer
+
+    blocks = []
+    for detail, top_n, quarterly in _COMPACTION_LEVELS:
+        recent, older = months[:detail], months[detail:]
+        blocks = ["Recent months:\n"] + [_period_lines(month_label(d['month']), d, top_n) for d in recent]
+        if older:
+            period_of = _quarter if quarterly else (lambda month: month[:4])
+            blocks.append("\nEarlier totals:\n")
+            blocks += [_period_lines(label, data, top_n) for label, data in _period_totals(older, period_of)]
+        if estimate_tokens(header + "".join(blocks) + footer) <= token_budget:
+            return header + "".join(blocks) + footer
+
+    # Still too long: drop the oldest periods until it fits
+    while len(blocks) > 2 and estimate_tokens(header + "".join(blocks) + footer) > token_budget:
+        blocks.pop()
+    return header + "".join(blocks) + footer
+
+
+SYSTEM_PROMPT = 'You are FinBot, a financial assistant. Answer questions directly using the user\'s financial data. Be specific, helpful, and concise (2-3 sentences). Never add disclaimers or unnecessary warnings.'
+NO_DATA_MESSAGE = "No financial data available. Please add some income or expenses to get started."
+
+# Chat backend; the ollama module by default. set_client swaps in e.g. utils.ollama_stub.StubClient().
+_client = None
+
+
+def set_client(client):
+    """Use client (anything with an ollama-compatible chat()) for FinBot; None restores ollama."""
+    global _client
+    _client = client
+
+
+def get_client():
+    if _client is not None:
+        return _client
+    if os.environ.get("FINBOT_OLLAMA_STUB"):
+        from utils.ollama_stub import StubClient
+        return StubClient()
+    return ollama if OLLAMA_AVAILABLE else None
+
+
+def _as_summary(financial_data):
+    if isinstance(financial_data, dict) and 'months' in financial_data:
+        return financial_data
+    return summarize_transactions(financial_data)
+
+
+def build_prompt(user_query, summary, token_budget=PROMPT_TOKEN_BUDGET, context=None):
+    """
+    Prompt for the model. With a retrieval context (see utils.retrieval) only
+    the overall totals plus that context are sent instead of the monthly summary.
+    """
+    if context:
+        total_income, total_expense = summary['total_income'], summary['total_expense']
+        spending_ratio = (total_expense / total_income * 100) if total_income > 0 else 0
+        summary_text = (f"Overall Total: Income ₹{total_income:.2f}, Expenses ₹{total_expense:.2f}\n\n"
+                        f"Relevant data for this question:\n{context}\n\n"
+                        f"Overall spending: {spending_ratio:.1f}% of income\n")
+    else:
+        summary_text = build_summary_text(summary, token_budget)
+    return f"""Question: {user_query}
 
 My Financial Summary:
-{summary}
+{summary_text}
 
 Answer the question directly based on my data above. Give practical advice in 2-3 clear sentences. Be specific about my spending patterns."""
 
-    last_exc = None
-    
-    if OLLAMA_AVAILABLE:
+
+# Using llama3.2:1b - small, fast model (1.3GB)
+DEFAULT_MODEL = 'llama3.2:1b'
+DEFAULT_OPTIONS = {
+    'temperature': 0.7,
+    'num_predict': 100  # Limit response length
+}
+# How long Ollama keeps the model in memory after the last request
+DEFAULT_KEEP_ALIVE = '30m'
+# Seconds before retrying a failed warm-up; doubles after each further failure
+WARMUP_RETRY_SECONDS = float(os.environ.get("FINBOT_WARMUP_RETRY", 60))
+WARMUP_RETRY_MAX_SECONDS = 3600
+
+
+def _field(response, name, default=None):
+    """Read a field from an ollama response that may be a dict or a response object."""
+    if isinstance(response, dict):
+        return response.get(name, default)
+    return getattr(response, name, default)
+
+
+class ModelManager:
+    """
+    Owns the FinBot model's configuration and lifecycle.
+
+    Model name, options and keep_alive come from FINBOT_MODEL, FINBOT_OPTIONS
+    (a JSON object merged over the defaults) and FINBOT_KEEP_ALIVE. warm_up()
+    loads the model in a background thread at app start so the first question
+    does not pay the load time, and record() keeps Ollama's reported load vs.
+    inference durations for each answer.
+    """
+
+    def __init__(self, model=None, options=None, keep_alive=None):
+        self.model = model or os.environ.get("FINBOT_MODEL", DEFAULT_MODEL)
+        self.options = dict(DEFAULT_OPTIONS)
+        self.options.update(options if options is not None else json.loads(os.environ.get("FINBOT_OPTIONS", "{}")))
+        self.keep_alive = keep_alive or os.environ.get("FINBOT_KEEP_ALIVE", DEFAULT_KEEP_ALIVE)
+        self.state = "cold"
+        self.warmup_seconds = None
+        self.last_error = None
+        self.failures = 0
+        self.retry_at = 0.0
+        self.requests = 0
+        self.total_load_ms = 0.0
+        self.total_inference_ms = 0.0
+        self.total_prompt_tokens = 0
+        self.last = {}
+        self._lock = threading.Lock()
+
+    def warm_up(self, client=None, background=True):
+        """
+        Load the model into Ollama's memory, once per process. A failed load is
+        retried only after a backoff (see WARMUP_RETRY_SECONDS), not on every rerun.
+        """
+        with self._lock:
+            if self.state in ("loading", "ready"):
+                return
+            if self.state == "failed" and time.monotonic() < self.retry_at:
+                return
+            self.state = "loading"
+        if background:
+            threading.Thread(target=self._load, args=(client,), name="finbot-warmup", daemon=True).start()
+        else:
+            self._load(client)
+
+    def _load(self, client):
+        client = client or get_client()
+        if client is None:
+            self.state = "cold"
+            return
+        start = time.perf_counter()
         try:
-            # Using llama3.2:1b - small, fast model (1.3GB)
-            response = ollama.chat(
-                model='llama3.2:1b',
-                messages=[
-                    {
-                        'role': 'system',
-                        'content': 'You are FinBot, a financial assistant. Answer questions directly using the user\'s financial data. Be specific, helpful, and concise (2-3 sentences). Never add disclaimers or unnecessary warnings.'
-                    },
-                    {
-                        'role': 'user',
-                        'content': prompt
-                    }
-                ],
-                options={
-                    'temperature': 0.7,
-                    'num_predict': 100  # Limit response length
-                }
-            )
-            
-            # Extract only the message content, not the full response object
-            if isinstance(response, dict):
-                if 'message' in response and isinstance(response['message'], dict):
-                    return response['message'].get('content', str(response))
-                elif 'message' in response and hasattr(response['message'], 'content'):
-                    return response['message'].content
-            
-            # If response has message attribute directly
-            if hasattr(response, 'message'):
-                if hasattr(response.message, 'content'):
-                    return response.message.content
-                elif isinstance(response.message, dict):
-                    return response.message.get('content', str(response))
-            
-            return str(response)
-            
+            if hasattr(client, "generate"):
+                # An empty prompt just loads the model
+                client.generate(model=self.model, prompt='', keep_alive=self.keep_alive)
+            else:
+                client.chat(model=self.model, messages=[], keep_alive=self.keep_alive)
+            self.warmup_seconds = time.perf_counter() - start
+            with self._lock:
+                self.state = "ready"
+                self.failures = 0
+                self.last_error = None
         except Exception as e:
-            print(f"Ollama call failed: {e}")
-            last_exc = e
+            with self._lock:
+                self.failures += 1
+                delay = min(WARMUP_RETRY_SECONDS * 2 ** (self.failures - 1), WARMUP_RETRY_MAX_SECONDS)
+                self.retry_at = time.monotonic() + delay
+                self.last_error = "".join(traceback.format_exception_only(type(e), e)).strip()
+                self.state = "failed"
+            logger.warning("FinBot warm-up failed (attempt %d, retrying in %.0fs): %s", self.failures, delay, e)
 
-    # Local fallback summary
+    def record(self, response, wall_seconds=None):
+        """Store load/inference latency (ns durations) and prompt token count from a final chat response."""
+        load_ms = (_field(response, 'load_duration') or 0) / 1e6
+        inference_ms = ((_field(response, 'prompt_eval_duration') or 0) + (_field(response, 'eval_duration') or 0)) / 1e6
+        prompt_tokens = _field(response, 'prompt_eval_count') or 0
+        with self._lock:
+            self.requests += 1
+            self.total_load_ms += load_ms
+            self.total_inference_ms += inference_ms
+            self.total_prompt_tokens += prompt_tokens
+            self.last = {"load_ms": load_ms, "inference_ms": inference_ms, "wall_ms": (wall_seconds or 0) * 1000,
+                         "prompt_tokens": prompt_tokens}
+        if load_ms > 0:
+            self.state = "ready"
+
+    def stats(self):
+        with self._lock:
+            n = self.requests or 1
+            return {
+                "model": self.model,
+                "state": self.state,
+                "warmup_seconds": self.warmup_seconds,
+                "last_error": self.last_error,
+                "requests": self.requests,
+                "avg_load_ms": self.total_load_ms / n,
+                "avg_inference_ms": self.total_inference_ms / n,
+                "avg_prompt_tokens": self.total_prompt_tokens / n,
+                "last": dict(self.last),
+            }
+
+
+model_manager = ModelManager()
+
+
+def start_model_warmup():
+    """Preload the FinBot model in the background; safe to call on every rerun."""
+    model_manager.warm_up()
+
+
+class ResponseCache:
+    """
+    Persistent FinBot answer cache in SQLite, keyed by the normalized question,
+    model, options and a hash of the financial summary. Entries expire after
+    ttl seconds and the least recently used ones are evicted past max_entries.
+    """
+
+    def __init__(self, db_name="finbot_cache.db", max_entries=1000, ttl=7 * 24 * 3600):
+        self.db = get_database(db_name)
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._counter_lock = threading.Lock()
+        self.db.ensure_schema("finbot_responses", '''
+            CREATE TABLE IF NOT EXISTS finbot_responses (
+                key TEXT PRIMARY KEY,
+                response TEXT NOT NULL,
+                created REAL NOT NULL,
+                last_used REAL NOT NULL);
+            CREATE INDEX IF NOT EXISTS idx_finbot_responses_last_used ON finbot_responses (last_used);''')
+
+    @staticmethod
+    def normalize_query(user_query):
+        """Lowercase, drop punctuation and collapse whitespace so trivial rephrasings share an entry."""
+        return " ".join(re.sub(r"[^\w\s]", " ", str(user_query).lower()).split())
+
+    def make_key(self, user_query, model, options, summary):
+        payload = json.dumps({
+            "query": self.normalize_query(user_query),
+            "model": model,
+            "options": options,
+            "summary": summary,
+        }, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def _count(self, hit):
+        with self._counter_lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def get(self, key):
+        now = time.time()
+        with self.db.transaction():
+            row = self.db.conn.execute("SELECT response FROM finbot_responses WHERE key = ? AND created >= ?",
+                                       (key, now - self.ttl)).fetchone()
+            if row is not None:
+                self.db.conn.execute("UPDATE finbot_responses SET last_used = ? WHERE key = ?", (now, key))
+        self._count(row is not None)
+        return row[0] if row else None
+
+    def put(self, key, response):
+        now = time.time()
+        with self.db.transaction():
+            self.db.conn.execute("INSERT OR REPLACE INTO finbot_responses (key, response, created, last_used) "
+                                 "VALUES (?, ?, ?, ?)", (key, response, now, now))
+            self.db.conn.execute("DELETE FROM finbot_responses WHERE created < ?", (now - self.ttl,))
+            self.db.conn.execute('''DELETE FROM finbot_responses WHERE key IN (
+                                        SELECT key FROM finbot_responses ORDER BY last_used DESC LIMIT -1 OFFSET ?)''',
+                                 (self.max_entries,))
+
+    def clear(self):
+        with self.db.transaction():
+            self.db.conn.execute("DELETE FROM finbot_responses")
+
+    def stats(self):
+        with self.db.reading() as conn:
+            size = conn.execute("SELECT COUNT(*) FROM finbot_responses").fetchone()[0]
+        return {"hits": self.hits, "misses": self.misses, "entries": size}
+
+
+_response_cache = None
+_response_cache_lock = threading.Lock()
+
+
+def get_response_cache():
+    """The process-wide ResponseCache, created on first use."""
+    global _response_cache
+    with _response_cache_lock:
+        if _response_cache is None:
+            _response_cache = ResponseCache()
+        return _response_cache
+
+
+def set_response_cache(cache):
+    """Replace the process-wide ResponseCache (e.g. with a different file or limits)."""
+    global _response_cache
+    with _response_cache_lock:
+        _response_cache = cache
+
+
+# Shared across sessions: bounds concurrent model calls, queue length and latency
+LLM_TIMEOUT = float(os.environ.get("FINBOT_TIMEOUT", 30))
+LLM_MAX_CONCURRENCY = int(os.environ.get("FINBOT_MAX_CONCURRENCY", 2))
+LLM_MAX_PENDING = int(os.environ.get("FINBOT_MAX_PENDING", 16))
+
+_gateway = None
+_gateway_lock = threading.Lock()
+
+
+def get_gateway():
+    """The process-wide LLMGateway, started on first use."""
+    global _gateway
+    with _gateway_lock:
+        if _gateway is None:
+            _gateway = LLMGateway(LLM_MAX_CONCURRENCY, LLM_MAX_PENDING, LLM_TIMEOUT)
+        return _gateway
+
+
+def _chat(client, prompt, stream=False):
+    gateway = get_gateway()
+    call = gateway.stream if stream else gateway.chat
+    return call(
+        client,
+        model=model_manager.model,
+        messages=[
+            {
+                'role': 'system',
+                'content': SYSTEM_PROMPT
+            },
+            {
+                'role': 'user',
+                'content': prompt
+            }
+        ],
+        options=model_manager.options,
+        keep_alive=model_manager.keep_alive
+    )
+
+
+def _message_content(response):
+    """Extract only the message content, not the full response object."""
+    if isinstance(response, dict):
+        if 'message' in response and isinstance(response['message'], dict):
+            return response['message'].get('content', str(response))
+        elif 'message' in response and hasattr(response['message'], 'content'):
+            return response['message'].content
+
+    # If response has message attribute directly
+    if hasattr(response, 'message'):
+        if hasattr(response.message, 'content'):
+            return response.message.content
+        elif isinstance(response.message, dict):
+            return response.message.get('content', str(response))
+
+    return str(response)
+
+
+def local_summary(summary, last_exc=None):
+    """Plain-text answer built from the summary alone, used when the model is unavailable."""
+    total_income = summary['total_income']
+    total_expense = summary['total_expense']
     try:
-        # Use the same monthly_data we already calculated
-        if not monthly_data:
-            return "No financial data available. Please add some income or expenses to get started."
-        
+        if not summary['months']:
+            return NO_DATA_MESSAGE
+
         parts = []
         parts.append(f"Financial Summary: Total income ₹{total_income:.2f}, total expenses ₹{total_expense:.2f}.")
-        
+
         # Show month-by-month breakdown
-        for month, data in sorted(monthly_data.items(), reverse=True)[:3]:  # Last 3 months
-            parts.append(f"\n{month}: Income ₹{data['total_income']:.2f}, Expenses ₹{data['total_expense']:.2f}")
+        for data in summary['months'][:3]:  # Last 3 months
+            parts.append(f"\n{month_label(data['month'])}: Income ₹{data['income']:.2f}, Expenses ₹{data['expense']:.2f}")
             if data['categories']:
                 top_cat = max(data['categories'].items(), key=lambda x: x[1])
                 parts.append(f" (Top spending: {top_cat[0]} ₹{top_cat[1]:.2f})")
-        
+
         if total_income > 0:
             ratio = (total_expense / total_income) * 100
             parts.append(f"\n\nOverall you're spending {ratio:.1f}% of your income.")
@@ -170,10 +500,100 @@ Answer the question directly based on my data above. Give practical advice in 2-
                 parts.append(" Nice work — your expenses are under control.")
             else:
                 parts.append(" Consider reviewing recurring costs.")
-        
+
         parts.append("\n\nNote: Ollama AI is unavailable. This is a basic summary from your data.")
         return " ".join(parts)
 
     except Exception:
         tb = traceback.format_exception_only(type(last_exc), last_exc) if last_exc else []
         return "FinBot is currently unavailable. Please try again later.\n" + ("".join(tb) if tb else "")
+
+
+def _has_data(summary):
+    return bool(summary['months'] or summary['total_income'] or summary['total_expense'])
+
+
+def get_budget_insights(user_query, financial_data, context=None):
+    """
+    Get budget or expense insights using Ollama local model.
+    Falls back to local summary if Ollama is unavailable, busy or times out
+    (see LLMGateway). Model answers are cached per question and data snapshot
+    (see ResponseCache).
+
+    financial_data is normally the precomputed Account.financialSummary(), whose
+    size depends only on the number of months and categories. The older
+    Account.format_transactions_for_ai() lists are still accepted and
+    summarized here. context is optional question-specific text from
+    utils.retrieval.retrieve_context.
+    """
+    summary = _as_summary(financial_data)
+    if not _has_data(summary):
+        return NO_DATA_MESSAGE
+
+    cache = get_response_cache()
+    key = cache.make_key(user_query, model_manager.model, model_manager.options, {'summary': summary, 'context': context})
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+
+    last_exc = None
+    client = get_client()
+    if client is not None:
+        try:
+            start = time.perf_counter()
+            response = _chat(client, build_prompt(user_query, summary, context=context))
+            model_manager.record(response, time.perf_counter() - start)
+            answer = _message_content(response)
+            cache.put(key, answer)
+            return answer
+        except Exception as e:
+            print(f"Ollama call failed: {e}")
+            last_exc = e
+
+    # Local fallback summary
+    return local_summary(summary, last_exc)
+
+
+def stream_budget_insights(user_query, financial_data, context=None):
+    """
+    Streaming variant of get_budget_insights: yields the answer in chunks as
+    the model produces them (for st.write_stream). If the model cannot be
+    reached before the first chunk, yields the local summary instead.
+    """
+    summary = _as_summary(financial_data)
+    if not _has_data(summary):
+        yield NO_DATA_MESSAGE
+        return
+
+    cache = get_response_cache()
+    key = cache.make_key(user_query, model_manager.model, model_manager.options, {'summary': summary, 'context': context})
+    cached = cache.get(key)
+    if cached is not None:
+        yield cached
+        return
+
+    last_exc = None
+    client = get_client()
+    if client is not None:
+        started = False
+        try:
+            answer = []
+            start = time.perf_counter()
+            for chunk in _chat(client, build_prompt(user_query, summary, context=context), stream=True):
+                if _field(chunk, 'done'):
+                    model_manager.record(chunk, time.perf_counter() - start)
+                text = _message_content(chunk)
+                if text:
+                    started = True
+                    answer.append(text)
+                    yield text
+            cache.put(key, "".join(answer))
+            return
+        except Exception as e:
+            print(f"Ollama stream failed: {e}")
+            last_exc = e
+            if started:
+                yield "\n\n(FinBot's answer was cut off. Please try again.)"
+                return
+
+    yield local_summary(summary, last_exc)
@@ -0,0 +1,231 @@
+import json
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.cache import LRUCache
+from utils.database import get_database
+
+JOBS_DB = os.environ.get("FINTRACK_JOBS_DB", "jobs.db")
+JOB_WORKERS = int(os.environ.get("FINTRACK_JOB_WORKERS", 2))
+# Finished jobs older than this are deleted (0 keeps them forever)
+JOB_RETENTION_DAYS = float(os.environ.get("FINTRACK_JOB_RETENTION_DAYS", 7))
+
+# Identifies this server process on the jobs it submits. A pid is not enough:
+# in a container the server is often pid 1 after every restart.
+BOOT_ID = uuid.uuid4().hex
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = "queued", "running", "done", "failed", "cancelled"
+FINISHED = (DONE, FAILED, CANCELLED)
+
+JOBS_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    owner TEXT,
+    kind TEXT NOT NULL,
+    status TEXT NOT NULL,
+    progress REAL,
+    message TEXT,
+    result TEXT,
+    error TEXT,
+    pid INTEGER,
+    boot TEXT,
+    cancel_requested INTEGER NOT NULL DEFAULT 0,
+    created REAL NOT NULL,
+    started REAL,
+    finished REAL);
+CREATE INDEX IF NOT EXISTS idx_jobs_owner_created ON jobs (owner, created);
+'''
+
+
+class JobCancelled(Exception):
+    """Raised inside a job by Job.progress/Job.check once cancellation was requested."""
+
+
+class Job:
+    """Handle passed to a running job function to report progress and notice cancellation."""
+
+    def __init__(self, runner, job_id):
+        self.runner = runner
+        self.id = job_id
+
+    @property
+    def cancel_requested(self):
+        event = self.runner._cancel_events.get(self.id)
+        return event is not None and event.is_set()
+
+    def check(self):
+        if self.cancel_requested:
+            raise JobCancelled(f"Job {self.id} was cancelled")
+
+    def progress(self, fraction=None, message=None):
+        """Record progress (0..1, None when unknown) and stop here if the job was cancelled."""
+        self.check()
+        self.runner._update(self.id, progress=None if fraction is None else max(0.0, min(1.0, fraction)),
+                            message=message)
+
+
+class JobRunner:
+    """
+    Runs long operations (statement imports, report builds) on a thread pool
+    so the Streamlit script returns immediately, while each job's status,
+    progress and result are kept in a SQLite jobs table that pages poll.
+
+    Threads rather than processes: jobs work on the pooled SQLite connections
+    and on closures over Account objects, neither of which can be pickled.
+    Job functions receive a Job as their first argument and must return a
+    JSON-serializable result; results are also kept in memory for this process.
+    """
+
+    def __init__(self, db_name=None, max_workers=None, retention_days=None):
+        self.db = get_database(db_name or JOBS_DB)
+        self.db.ensure_schema("jobs", JOBS_SCHEMA)
+        with self.db.transaction() as conn:
+            # jobs tables created before boot ids were recorded
+            if not any(row[1] == "boot" for row in conn.execute("PRAGMA table_info(jobs)")):
+                conn.execute("ALTER TABLE jobs ADD COLUMN boot TEXT")
+        self.retention_days = JOB_RETENTION_DAYS if retention_days is None else retention_days
+        self._executor = ThreadPoolExecutor(max_workers=max_workers or JOB_WORKERS, thread_name_prefix="job")
+        self._futures = {}
+        self._cancel_events = {}
+        self._lock = threading.Lock()
+        self._results = LRUCache(maxsize=64)
+        self._recover()
+
+    def _recover(self):
+        # Jobs a previous server process left unfinished cannot be resumed (their closures are gone)
+        with self.db.transaction():
+            self.db.conn.execute(f'''UPDATE jobs SET status = '{FAILED}', error = 'Interrupted by a server restart',
+                                     finished = ? WHERE status IN ('{QUEUED}', '{RUNNING}') AND boot IS NOT ?''',
+                                 (time.time(), BOOT_ID))
+            self._prune()
+
+    def _prune(self):
+        """Delete finished jobs older than retention_days; call inside a transaction."""
+        if self.retention_days > 0:
+            self.db.conn.execute(f"DELETE FROM jobs WHERE status IN {FINISHED} AND finished < ?",
+                                 (time.time() - self.retention_days * 86400,))
+
+    def _update(self, job_id, **fields):
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self.db.transaction():
+            self.db.conn.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", list(fields.values()) + [job_id])
+
+    def _finish(self, job_id, status, **fields):
+        self._update(job_id, status=status, finished=time.time(), **fields)
+        with self._lock:
+            self._futures.pop(job_id, None)
+            self._cancel_events.pop(job_id, None)
+
+    def submit(self, kind, func, *args, owner=None, **kwargs):
+        """
+        Queue func(job, *args, **kwargs) and return the new job's id at once.
+
+        Args:
+            kind: short label such as 'import' or 'report'
+            owner: who may see the job (e.g. the user's email)
+        """
+        with self.db.transaction():
+            self._prune()
+            job_id = self.db.conn.execute(
+                "INSERT INTO jobs (owner, kind, status, progress, pid, boot, created) VALUES (?, ?, ?, 0, ?, ?, ?)",
+                (owner, kind, QUEUED, os.getpid(), BOOT_ID, time.time())).lastrowid
+        with self._lock:
+            self._cancel_events[job_id] = threading.Event()
+        future = self._executor.submit(self._run, job_id, func, args, kwargs)
+        with self._lock:
+            if job_id in self._cancel_events:
+                self._futures[job_id] = future
+        return job_id
+
+    def _run(self, job_id, func, args, kwargs):
+        job = Job(self, job_id)
+        if job.cancel_requested:
+            self._finish(job_id, CANCELLED, message="Cancelled before it started")
+            return
+        self._update(job_id, status=RUNNING, started=time.time())
+        try:
+            result = func(job, *args, **kwargs)
+        except JobCancelled:
+            self._finish(job_id, CANCELLED, message="Cancelled")
+        except Exception as e:
+            self._finish(job_id, FAILED, error=f"{type(e).__name__}: {e}")
+        else:
+            self._results.put(job_id, result)
+            self._finish(job_id, DONE, progress=1.0, result=json.dumps(result, default=str))
+
+    def cancel(self, job_id):
+        """
+        Ask a job to stop. Queued jobs never start; running jobs stop at their
+        next Job.progress/check call. Returns False if the job already finished.
+        """
+        with self._lock:
+            event = self._cancel_events.get(job_id)
+        if event is not None:
+            event.set()
+        with self.db.transaction():
+            changed = self.db.conn.execute(
+                f"UPDATE jobs SET cancel_requested = 1 WHERE id = ? AND status NOT IN {FINISHED}", (job_id,)).rowcount
+        with self._lock:
+            future = self._futures.get(job_id)
+        if future is not None and future.cancel():
+            self._finish(job_id, CANCELLED, message="Cancelled before it started")
+        return bool(changed)
+
+    def _row(self, row):
+        job = dict(zip(("id", "owner", "kind", "status", "progress", "message", "result", "error",
+                        "cancel_requested", "created", "started", "finished"), row))
+        job["result"] = json.loads(job["result"]) if job["result"] is not None else None
+        job["cancel_requested"] = bool(job["cancel_requested"])
+        return job
+
+    _COLUMNS = "id, owner, kind, status, progress, message, result, error, cancel_requested, created, started, finished"
+
+    def get(self, job_id):
+        """The job's row as a dict (result decoded from JSON), or None."""
+        with self.db.reading() as conn:
+            row = conn.execute(f"SELECT {self._COLUMNS} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._row(row) if row else None
+
+    def result(self, job_id):
+        """The in-memory result of a job finished by this process, or None."""
+        return self._results.get(job_id)
+
+    def jobs(self, owner, kind=None, limit=10):
+        """An owner's most recent jobs, newest first."""
+        where, params = "owner = ?", [owner]
+        if kind is not None:
+            where, params = where + " AND kind = ?", params + [kind]
+        with self.db.reading() as conn:
+            rows = conn.execute(f"SELECT {self._COLUMNS} FROM jobs WHERE {where} ORDER BY created DESC, id DESC "
+                                f"LIMIT ?", params + [int(limit)]).fetchall()
+        return [self._row(row) for row in rows]
+
+    def wait(self, job_id, timeout=None):
+        """Block until the job finishes or timeout seconds pass; returns get(job_id)."""
+        with self._lock:
+            future = self._futures.get(job_id)
+        if future is not None:
+            try:
+                future.result(timeout)
+            except Exception:
+                pass
+        return self.get(job_id)
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+_runner = None
+_runner_lock = threading.Lock()
+
+
+def get_job_runner():
+    """The process-wide JobRunner shared by every Streamlit session."""
+    global _runner
+    with _runner_lock:
+        if _runner is None:
+            _runner = JobRunner()
+        return _runner
@@ -0,0 +1,33 @@
+import streamlit as st
+from utils.jobs import get_job_runner, FINISHED, QUEUED
+
+
+def render_job_progress(job_id, label, poll_seconds=1.0):
+    """
+    Show a background job's progress bar and a Cancel button.
+
+    Only this block reruns while polling, every poll_seconds; once the job
+    finishes the whole page reruns so it can show the result.
+
+    Args:
+        job_id: id returned by JobRunner.submit
+        label: what the job is doing, e.g. "Importing transactions"
+    """
+    runner = get_job_runner()
+
+    @st.fragment(run_every=poll_seconds)
+    def poll():
+        job = runner.get(job_id)
+        if job is None or job["status"] in FINISHED:
+            st.rerun()
+        if job["cancel_requested"]:
+            text = f"{label}: cancelling..."
+        elif job["status"] == QUEUED:
+            text = f"{label}: waiting for a free worker..."
+        else:
+            text = f"{label}: {job['message'] or 'running...'}"
+        st.progress(job["progress"] or 0.0, text=text)
+        st.button("Cancel", key=f"cancel_job_{job_id}", on_click=runner.cancel, args=(job_id,),
+                  disabled=job["cancel_requested"])
+
+    poll()
@@ -0,0 +1,179 @@
+import asyncio
+import functools
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class LLMBusyError(RuntimeError):
+    """Raised when too many LLM requests are already queued."""
+
+
+class LLMTimeoutError(TimeoutError):
+    """Raised when the model does not answer (or stops streaming) within the timeout."""
+
+
+_DONE = object()
+
+
+class LLMGateway:
+    """
+    Runs LLM calls on one background asyncio loop shared by every Streamlit session.
+
+    - at most max_concurrency requests talk to the model at once (semaphore);
+    - at most max_pending requests may be running or waiting; more are rejected
+      immediately with LLMBusyError instead of piling up script threads;
+    - every request (including time queued), and every gap between streamed
+      chunks, is bounded by timeout.
+
+    Clients exposing an ollama-style AsyncClient factory (the ollama module) are
+    called natively async and cancelled on timeout. Plain synchronous clients
+    run on a thread pool sized to max_concurrency; a blocking call cannot be
+    interrupted, so after a timeout it keeps its slot until it actually returns.
+    """
+
+    def __init__(self, max_concurrency=2, max_pending=16, timeout=30.0):
+        self.max_concurrency = max_concurrency
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self._pending = 0
+        self._pending_lock = threading.Lock()
+        self._async_clients = {}
+        # One thread per slot: a blocking call only starts once it holds a slot
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="llm-call")
+
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="llm-gateway", daemon=True)
+        self._thread.start()
+        # The semaphore must be created on the loop that uses it
+        self._semaphore = asyncio.run_coroutine_threadsafe(self._make_semaphore(), self._loop).result()
+
+    async def _make_semaphore(self):
+        return asyncio.Semaphore(self.max_concurrency)
+
+    @property
+    def pending(self):
+        return self._pending
+
+    def _admit(self):
+        with self._pending_lock:
+            if self._pending >= self.max_pending:
+                raise LLMBusyError(f"FinBot is busy ({self._pending} requests queued)")
+            self._pending += 1
+
+    def _release(self, _future=None):
+        with self._pending_lock:
+            self._pending -= 1
+
+    def _submit(self, make_coro):
+        self._admit()
+        future = asyncio.run_coroutine_threadsafe(make_coro(), self._loop)
+        future.add_done_callback(self._release)
+        return future
+
+    def _async_client(self, client):
+        factory = getattr(client, "AsyncClient", None)
+        if factory is None:
+            return None
+        if id(client) not in self._async_clients:
+            self._async_clients[id(client)] = factory()
+        return self._async_clients[id(client)]
+
+    def _run_blocking(self, blocking, func, *args):
+        """Run func on the gateway's pool, remembering the call in blocking for _release_slot."""
+        work = self._executor.submit(func, *args)
+        blocking[:] = [work]
+        return asyncio.wrap_future(work)
+
+    def _release_slot(self, blocking):
+        work = blocking[0] if blocking else None
+        if work is not None and not work.done():
+            # A timed-out synchronous call is still talking to the model
+            loop = self._loop
+            work.add_done_callback(lambda _f: loop.call_soon_threadsafe(self._semaphore.release))
+        else:
+            self._semaphore.release()
+
+    async def _acquire(self, timeout):
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout)
+        except asyncio.TimeoutError:
+            raise LLMTimeoutError(f"FinBot queue did not clear within {timeout:g}s") from None
+
+    async def _call(self, client, blocking, **kwargs):
+        async_client = self._async_client(client)
+        if async_client is not None:
+            return await async_client.chat(**kwargs)
+        return await self._run_blocking(blocking, functools.partial(client.chat, **kwargs))
+
+    async def _chat(self, client, timeout, kwargs):
+        loop = asyncio.get_running_loop()
+        # Time spent queued for a slot counts toward the timeout
+        deadline = loop.time() + timeout
+        await self._acquire(timeout)
+        blocking = []
+        try:
+            return await asyncio.wait_for(self._call(client, blocking, **kwargs), max(deadline - loop.time(), 0))
+        except asyncio.TimeoutError:
+            raise LLMTimeoutError(f"No answer from the model within {timeout:g}s") from None
+        finally:
+            self._release_slot(blocking)
+
+    async def _chunks(self, response, blocking):
+        if hasattr(response, "__anext__"):
+            async for chunk in response:
+                yield chunk
+            return
+        iterator = iter(response)
+        while True:
+            chunk = await self._run_blocking(blocking, next, iterator, _DONE)
+            if chunk is _DONE:
+                return
+            yield chunk
+
+    async def _pump(self, client, timeout, kwargs, out):
+        await self._acquire(timeout)
+        blocking = []
+        try:
+            response = await asyncio.wait_for(self._call(client, blocking, stream=True, **kwargs), timeout)
+            chunks = self._chunks(response, blocking).__aiter__()
+            while True:
+                try:
+                    chunk = await asyncio.wait_for(chunks.__anext__(), timeout)
+                except StopAsyncIteration:
+                    break
+                out.put(chunk)
+        except asyncio.TimeoutError:
+            raise LLMTimeoutError(f"Model stalled for more than {timeout:g}s") from None
+        finally:
+            self._release_slot(blocking)
+
+    def chat(self, client, timeout=None, **kwargs):
+        """Blocking chat() for the calling script thread, bounded by timeout seconds."""
+        timeout = self.timeout if timeout is None else timeout
+        return self._submit(lambda: self._chat(client, timeout, kwargs)).result()
+
+    def stream(self, client, timeout=None, **kwargs):
+        """
+        Generator of streamed chat chunks. timeout bounds the wait for the first
+        chunk and between chunks; closing the generator cancels the request.
+        """
+        timeout = self.timeout if timeout is None else timeout
+        out = queue.Queue()
+        future = self._submit(lambda: self._pump(client, timeout, kwargs, out))
+        future.add_done_callback(lambda _f: out.put(_DONE))
+        try:
+            while True:
+                chunk = out.get()
+                if chunk is _DONE:
+                    break
+                yield chunk
+            if not future.cancelled() and future.exception() is not None:
+                raise future.exception()
+        finally:
+            future.cancel()
+
+    def close(self):
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
+        self._executor.shutdown(wait=False)
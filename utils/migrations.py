@@ -0,0 +1,261 @@
+import sqlite3
+
+
+def _rollup_triggers(table, label, rollup, fallback, tenant=None):
+    """
+    DDL for a (month, label) rollup of table, backfilled from existing rows and
+    kept in step by triggers. Rows whose date cannot be parsed go under month 'unknown'.
+    With a tenant column the rollup is kept per tenant as (tenant, month, label).
+    """
+    month = "COALESCE(strftime('%Y-%m', {row}.date), 'unknown')"
+    key = f"COALESCE({{row}}.{label}, '{fallback}')"
+    columns = f"{tenant}, " if tenant else ""
+    values = f"{{row}}.{tenant}, " if tenant else ""
+    match = f"{tenant} = {{row}}.{tenant} AND " if tenant else ""
+    group = "1, 2, 3" if tenant else "1, 2"
+
+    def add(row):
+        m, k, t, w = month.format(row=row), key.format(row=row), values.format(row=row), match.format(row=row)
+        return f'''
+    INSERT OR IGNORE INTO {rollup} ({columns}month, {label}, total, count) VALUES ({t}{m}, {k}, 0, 0);
+    UPDATE {rollup} SET total = total + COALESCE({row}.amount, 0), count = count + 1
+        WHERE {w}month = {m} AND {label} = {k};'''
+
+    def remove(row):
+        m, k, w = month.format(row=row), key.format(row=row), match.format(row=row)
+        return f'''
+    UPDATE {rollup} SET total = total - COALESCE({row}.amount, 0), count = count - 1
+        WHERE {w}month = {m} AND {label} = {k};
+    DELETE FROM {rollup} WHERE {w}month = {m} AND {label} = {k} AND count <= 0;'''
+
+    return f'''
+CREATE TABLE IF NOT EXISTS {rollup} ({f"""
+    {tenant} TEXT NOT NULL,""" if tenant else ""}
+    month TEXT NOT NULL,
+    {label} TEXT NOT NULL,
+    total REAL NOT NULL DEFAULT 0,
+    count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY ({columns}month, {label}));
+
+DELETE FROM {rollup};
+INSERT INTO {rollup} ({columns}month, {label}, total, count)
+    SELECT {values.format(row=table)}{month.format(row=table)}, {key.format(row=table)}, COALESCE(SUM(amount), 0), COUNT(*)
+    FROM {table} GROUP BY {group};
+
+CREATE TRIGGER IF NOT EXISTS {rollup}_insert AFTER INSERT ON {table} BEGIN{add("NEW")}
+END;
+CREATE TRIGGER IF NOT EXISTS {rollup}_update AFTER UPDATE OF date, amount, {label} ON {table} BEGIN{remove("OLD")}{add("NEW")}
+END;
+CREATE TRIGGER IF NOT EXISTS {rollup}_delete AFTER DELETE ON {table} BEGIN{remove("OLD")}
+END;
+'''
+
+# Versioned schema for a user's ledger database (expenses, income and derived tables).
+# Each entry is (version, description, script). The database's PRAGMA user_version
+# records the last version applied; pending scripts run in order, each in its own
+# transaction together with the user_version bump. Only ever append new versions.
+LEDGER_MIGRATIONS = [
+    (1, "create expenses and income tables", '''
+CREATE TABLE IF NOT EXISTS expenses (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT,
+    date DATE,
+    amount REAL,
+    category TEXT,
+    description TEXT);
+
+CREATE TABLE IF NOT EXISTS income (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT,
+    date DATE,
+    amount REAL,
+    source TEXT,
+    description TEXT);
+'''),
+
+    # Running totals kept in step with the income/expenses tables by triggers, so
+    # every insert, update and delete (including executemany batches) adjusts the
+    # balance inside the same transaction as the write itself.
+    (2, "balance ledger", '''
+CREATE TABLE IF NOT EXISTS balance (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    total_income REAL NOT NULL DEFAULT 0,
+    total_expense REAL NOT NULL DEFAULT 0);
+
+INSERT OR IGNORE INTO balance (id, total_income, total_expense) VALUES (1,
+    (SELECT COALESCE(SUM(amount), 0) FROM income),
+    (SELECT COALESCE(SUM(amount), 0) FROM expenses));
+
+CREATE TRIGGER IF NOT EXISTS balance_expense_insert AFTER INSERT ON expenses BEGIN
+    UPDATE balance SET total_expense = total_expense + COALESCE(NEW.amount, 0) WHERE id = 1;
+END;
+CREATE TRIGGER IF NOT EXISTS balance_expense_update AFTER UPDATE OF amount ON expenses BEGIN
+    UPDATE balance SET total_expense = total_expense - COALESCE(OLD.amount, 0) + COALESCE(NEW.amount, 0) WHERE id = 1;
+END;
+CREATE TRIGGER IF NOT EXISTS balance_expense_delete AFTER DELETE ON expenses BEGIN
+    UPDATE balance SET total_expense = total_expense - COALESCE(OLD.amount, 0) WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS balance_income_insert AFTER INSERT ON income BEGIN
+    UPDATE balance SET total_income = total_income + COALESCE(NEW.amount, 0) WHERE id = 1;
+END;
+CREATE TRIGGER IF NOT EXISTS balance_income_update AFTER UPDATE OF amount ON income BEGIN
+    UPDATE balance SET total_income = total_income - COALESCE(OLD.amount, 0) + COALESCE(NEW.amount, 0) WHERE id = 1;
+END;
+CREATE TRIGGER IF NOT EXISTS balance_income_delete AFTER DELETE ON income BEGIN
+    UPDATE balance SET total_income = total_income - COALESCE(OLD.amount, 0) WHERE id = 1;
+END;
+'''),
+
+    # Older rows may hold 'YYYY-MM-DD HH:MM:SS' (pandas Timestamps) instead of a
+    # plain ISO date, which breaks string range comparisons and monthly grouping.
+    (3, "normalize dates to ISO text", '''
+UPDATE expenses SET date = date(date) WHERE date(date) IS NOT NULL AND date != date(date);
+UPDATE income SET date = date(date) WHERE date(date) IS NOT NULL AND date != date(date);
+'''),
+
+    (4, "date and label indexes", '''
+CREATE INDEX IF NOT EXISTS idx_expenses_date ON expenses (date);
+CREATE INDEX IF NOT EXISTS idx_expenses_category_date ON expenses (category, date);
+CREATE INDEX IF NOT EXISTS idx_income_date ON income (date);
+CREATE INDEX IF NOT EXISTS idx_income_source_date ON income (source, date);
+'''),
+
+    # Month x category and month x source totals updated by triggers in the same
+    # transaction as each write, so reports never have to scan the raw rows.
+    (5, "monthly rollups",
+        _rollup_triggers("expenses", "category", "expense_monthly_category", "Uncategorized")
+        + _rollup_triggers("income", "source", "income_monthly_source", "Other") + '''
+CREATE VIEW IF NOT EXISTS monthly_totals AS
+    SELECT month, SUM(income) AS income, SUM(expense) AS expense FROM (
+        SELECT month, total AS income, 0 AS expense FROM income_monthly_source
+        UNION ALL
+        SELECT month, 0 AS income, total AS expense FROM expense_monthly_category)
+    GROUP BY month;
+'''),
+
+    # Counter bumped by every write to either table; caches key derived data on it.
+    (6, "data version counter", '''
+CREATE TABLE IF NOT EXISTS data_version (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    version INTEGER NOT NULL DEFAULT 0);
+
+INSERT OR IGNORE INTO data_version (id, version) VALUES (1, 0);
+''' + "".join(f'''
+CREATE TRIGGER IF NOT EXISTS data_version_{table}_{op.lower()} AFTER {op} ON {table} BEGIN
+    UPDATE data_version SET version = version + 1 WHERE id = 1;
+END;''' for table in ("expenses", "income") for op in ("INSERT", "UPDATE", "DELETE"))),
+
+    # Statement imports tag rows with a fingerprint (see utils.statements.fingerprint_transactions)
+    # so re-importing an overlapping statement can skip rows already stored.
+    # Manually entered rows keep a NULL fingerprint and are never treated as duplicates.
+    (7, "import fingerprints", '''
+ALTER TABLE expenses ADD COLUMN fingerprint TEXT;
+ALTER TABLE income ADD COLUMN fingerprint TEXT;
+CREATE UNIQUE INDEX IF NOT EXISTS idx_expenses_fingerprint ON expenses (fingerprint) WHERE fingerprint IS NOT NULL;
+CREATE UNIQUE INDEX IF NOT EXISTS idx_income_fingerprint ON income (fingerprint) WHERE fingerprint IS NOT NULL;
+'''),
+]
+
+# Versioned schema for the consolidated multi-tenant store: one database holding
+# every user's ledger, with each row (and each derived row) keyed by user_id.
+TENANT_MIGRATIONS = [
+    (1, "create expenses and income tables with user_id", '''
+CREATE TABLE IF NOT EXISTS expenses (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id TEXT NOT NULL,
+    name TEXT,
+    date DATE,
+    amount REAL,
+    category TEXT,
+    description TEXT);
+
+CREATE TABLE IF NOT EXISTS income (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id TEXT NOT NULL,
+    name TEXT,
+    date DATE,
+    amount REAL,
+    source TEXT,
+    description TEXT);
+
+CREATE INDEX IF NOT EXISTS idx_expenses_user_date ON expenses (user_id, date);
+CREATE INDEX IF NOT EXISTS idx_expenses_user_category_date ON expenses (user_id, category, date);
+CREATE INDEX IF NOT EXISTS idx_income_user_date ON income (user_id, date);
+CREATE INDEX IF NOT EXISTS idx_income_user_source_date ON income (user_id, source, date);
+'''),
+
+    # One ledger row per user, created by the first write that touches it
+    (2, "per-user balance ledger", '''
+CREATE TABLE IF NOT EXISTS balance (
+    user_id TEXT PRIMARY KEY,
+    total_income REAL NOT NULL DEFAULT 0,
+    total_expense REAL NOT NULL DEFAULT 0);
+''' + "".join(f'''
+CREATE TRIGGER IF NOT EXISTS balance_{kind}_insert AFTER INSERT ON {table} BEGIN
+    INSERT OR IGNORE INTO balance (user_id) VALUES (NEW.user_id);
+    UPDATE balance SET {column} = {column} + COALESCE(NEW.amount, 0) WHERE user_id = NEW.user_id;
+END;
+CREATE TRIGGER IF NOT EXISTS balance_{kind}_update AFTER UPDATE OF amount ON {table} BEGIN
+    UPDATE balance SET {column} = {column} - COALESCE(OLD.amount, 0) WHERE user_id = OLD.user_id;
+    INSERT OR IGNORE INTO balance (user_id) VALUES (NEW.user_id);
+    UPDATE balance SET {column} = {column} + COALESCE(NEW.amount, 0) WHERE user_id = NEW.user_id;
+END;
+CREATE TRIGGER IF NOT EXISTS balance_{kind}_delete AFTER DELETE ON {table} BEGIN
+    UPDATE balance SET {column} = {column} - COALESCE(OLD.amount, 0) WHERE user_id = OLD.user_id;
+END;''' for kind, table, column in (("expense", "expenses", "total_expense"),
+                                    ("income", "income", "total_income")))),
+
+    (3, "per-user monthly rollups",
+        _rollup_triggers("expenses", "category", "expense_monthly_category", "Uncategorized", tenant="user_id")
+        + _rollup_triggers("income", "source", "income_monthly_source", "Other", tenant="user_id") + '''
+CREATE VIEW IF NOT EXISTS monthly_totals AS
+    SELECT user_id, month, SUM(income) AS income, SUM(expense) AS expense FROM (
+        SELECT user_id, month, total AS income, 0 AS expense FROM income_monthly_source
+        UNION ALL
+        SELECT user_id, month, 0 AS income, total AS expense FROM expense_monthly_category)
+    GROUP BY user_id, month;
+'''),
+
+    (4, "per-user data version counter", '''
+CREATE TABLE IF NOT EXISTS data_version (
+    user_id TEXT PRIMARY KEY,
+    version INTEGER NOT NULL DEFAULT 0);
+''' + "".join(f'''
+CREATE TRIGGER IF NOT EXISTS data_version_{table}_{op.lower()} AFTER {op} ON {table} BEGIN
+    INSERT OR IGNORE INTO data_version (user_id) VALUES ({row}.user_id);
+    UPDATE data_version SET version = version + 1 WHERE user_id = {row}.user_id;
+END;''' for table in ("expenses", "income")
+          for op, row in (("INSERT", "NEW"), ("UPDATE", "NEW"), ("DELETE", "OLD")))),
+
+    (5, "per-user import fingerprints", '''
+ALTER TABLE expenses ADD COLUMN fingerprint TEXT;
+ALTER TABLE income ADD COLUMN fingerprint TEXT;
+CREATE UNIQUE INDEX IF NOT EXISTS idx_expenses_user_fingerprint ON expenses (user_id, fingerprint) WHERE fingerprint IS NOT NULL;
+CREATE UNIQUE INDEX IF NOT EXISTS idx_income_user_fingerprint ON income (user_id, fingerprint) WHERE fingerprint IS NOT NULL;
+'''),
+]
+
+
+def schema_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn, migrations=LEDGER_MIGRATIONS):
+    """
+    Bring a database up to the latest version in migrations, in place.
+
+    Returns:
+        the schema version after migrating
+    """
+    current = schema_version(conn)
+    for version, description, script in migrations:
+        if version <= current:
+            continue
+        try:
+            conn.executescript(f"BEGIN;\n{script}\nPRAGMA user_version = {int(version)};\nCOMMIT;")
+        except sqlite3.Error as e:
+            conn.rollback()
+            raise sqlite3.DatabaseError(f"Migration {version} ({description}) failed: {e}") from e
+        current = version
+    return current
@@ -0,0 +1,48 @@
+"""
+Offline stand-in for the ollama client, for running FinBot without a model.
+
+Enable it with the FINBOT_OLLAMA_STUB=1 environment variable or
+finbot.set_client(StubClient()). It answers with a fixed sentence built from
+the prompt and, when stream=True, yields it word by word like ollama does.
+"""
+import time
+
+
+class StubClient:
+    def __init__(self, reply=None, delay=0.0):
+        self.reply = reply
+        self.delay = delay
+        self.calls = []
+
+    def _answer(self, messages):
+        if self.reply is not None:
+            return self.reply
+        prompt = messages[-1]['content'] if messages else ''
+        question = prompt.split('\n', 1)[0].replace('Question:', '').strip()
+        return f"(stub) You asked: {question}. Your summary has {prompt.count('Income:')} months of data."
+
+    def chat(self, model, messages, options=None, stream=False, **kwargs):
+        self.calls.append({'model': model, 'messages': messages, 'options': options, 'stream': stream, **kwargs})
+        answer = self._answer(messages)
+        prompt_tokens = sum(len(m.get('content', '').split()) for m in messages)
+        if not stream:
+            time.sleep(self.delay)
+            return {'model': model, 'message': {'role': 'assistant', 'content': answer}, 'done': True,
+                    'load_duration': 0, 'prompt_eval_duration': 0, 'eval_duration': int(self.delay * 1e9),
+                    'prompt_eval_count': prompt_tokens}
+        return self._stream(model, answer, prompt_tokens)
+
+    def generate(self, model, prompt='', **kwargs):
+        self.calls.append({'model': model, 'prompt': prompt, **kwargs})
+        time.sleep(self.delay)
+        return {'model': model, 'response': '', 'done': True}
+
+    def _stream(self, model, answer, prompt_tokens):
+        words = answer.split(' ')
+        for i, word in enumerate(words):
+            time.sleep(self.delay)
+            text = word if i == 0 else ' ' + word
+            yield {'model': model, 'message': {'role': 'assistant', 'content': text}, 'done': False}
+        yield {'model': model, 'message': {'role': 'assistant', 'content': ''}, 'done': True,
+               'load_duration': 0, 'prompt_eval_duration': 0, 'eval_duration': int(self.delay * len(words) * 1e9),
+               'prompt_eval_count': prompt_tokens}
@@ -0,0 +1,90 @@
+import base64
+import hashlib
+import hmac
+import os
+
+# Work factors for new hashes. Raising them makes each login cost more CPU;
+# existing hashes keep verifying and are upgraded on the next successful login.
+DEFAULT_SCHEME = os.environ.get("FINTRACK_PASSWORD_HASH", "scrypt")
+SCRYPT_N = int(os.environ.get("FINTRACK_SCRYPT_N", 2 ** 14))
+SCRYPT_R = int(os.environ.get("FINTRACK_SCRYPT_R", 8))
+SCRYPT_P = int(os.environ.get("FINTRACK_SCRYPT_P", 1))
+PBKDF2_ITERATIONS = int(os.environ.get("FINTRACK_PBKDF2_ITERATIONS", 600_000))
+
+SALT_BYTES = 16
+KEY_BYTES = 32
+
+
+def _b64(data):
+    return base64.b64encode(data).decode("ascii")
+
+
+class PasswordHasher:
+    """
+    Salted password hashing with hashlib's scrypt or PBKDF2-HMAC-SHA256.
+
+    Hashes are stored as self-describing strings, so the work factors can change
+    without invalidating existing ones:
+        scrypt$<n>$<r>$<p>$<salt>$<key>
+        pbkdf2_sha256$<iterations>$<salt>$<key>
+    Bare 64-character hex digests are the legacy unsalted SHA-256 format.
+    """
+
+    def __init__(self, scheme=None, n=None, r=None, p=None, iterations=None):
+        self.scheme = scheme or DEFAULT_SCHEME
+        if self.scheme not in ("scrypt", "pbkdf2_sha256"):
+            raise ValueError(f"Unknown password hash scheme {self.scheme!r}")
+        self.n = n or SCRYPT_N
+        self.r = r or SCRYPT_R
+        self.p = p or SCRYPT_P
+        self.iterations = iterations or PBKDF2_ITERATIONS
+
+    def __repr__(self):
+        if self.scheme == "scrypt":
+            return f"PasswordHasher(scrypt, n={self.n}, r={self.r}, p={self.p})"
+        return f"PasswordHasher(pbkdf2_sha256, iterations={self.iterations})"
+
+    @staticmethod
+    def _scrypt(password, salt, n, r, p):
+        # scrypt needs 128 * n * r bytes; allow that plus headroom over OpenSSL's 32 MB default
+        return hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p, dklen=KEY_BYTES,
+                              maxmem=256 * n * r + 1024 * 1024)
+
+    @staticmethod
+    def _pbkdf2(password, salt, iterations):
+        return hashlib.pbkdf2_hmac("sha256", password.encode(), salt, iterations, dklen=KEY_BYTES)
+
+    def hash(self, password):
+        salt = os.urandom(SALT_BYTES)
+        if self.scheme == "scrypt":
+            key = self._scrypt(password, salt, self.n, self.r, self.p)
+            return f"scrypt${self.n}${self.r}${self.p}${_b64(salt)}${_b64(key)}"
+        key = self._pbkdf2(password, salt, self.iterations)
+        return f"pbkdf2_sha256${self.iterations}${_b64(salt)}${_b64(key)}"
+
+    def verify(self, password, stored):
+        """Check password against a stored hash in any supported format, in constant time."""
+        if not stored:
+            return False
+        parts = stored.split("$")
+        try:
+            if parts[0] == "scrypt" and len(parts) == 6:
+                n, r, p = int(parts[1]), int(parts[2]), int(parts[3])
+                key = self._scrypt(password, base64.b64decode(parts[4]), n, r, p)
+                return hmac.compare_digest(key, base64.b64decode(parts[5]))
+            if parts[0] == "pbkdf2_sha256" and len(parts) == 4:
+                key = self._pbkdf2(password, base64.b64decode(parts[2]), int(parts[1]))
+                return hmac.compare_digest(key, base64.b64decode(parts[3]))
+        except (ValueError, TypeError):
+            return False
+        if len(stored) == 64:
+            legacy = hashlib.sha256(password.encode()).hexdigest()
+            return hmac.compare_digest(legacy, stored)
+        return False
+
+    def needs_rehash(self, stored):
+        """True for legacy hashes and hashes made with a different scheme or work factor."""
+        parts = stored.split("$")
+        if self.scheme == "scrypt":
+            return parts[:4] != ["scrypt", str(self.n), str(self.r), str(self.p)]
+        return parts[:2] != ["pbkdf2_sha256", str(self.iterations)]
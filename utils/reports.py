@@ -0,0 +1,111 @@
+import pandas as pd
+import plotly.express as px
+
+from utils.cache import LRUCache
+
+# Built reports keyed by (database, data version); old versions age out by LRU
+_report_cache = LRUCache(maxsize=64)
+
+
+def build_report(account):
+    """
+    Aggregate the rollup tables and build the Report page figures.
+
+    Returns:
+        dict with the aggregated 'frames' and the Plotly 'figures'
+        (a figure is None when there is not enough data for it)
+    """
+    return _report_from_rollups(account.ExpenseManager.monthlyCategoryTotals(),
+                                account.IncomeManager.monthlySourceTotals())
+
+
+def _snapshot_rollup(frame, label, fallback):
+    """(month, label, amount, count) totals of a snapshot table, matching the rollup tables."""
+    months = frame["date"].dt.strftime("%Y-%m").fillna("unknown")
+    labels = frame[label].fillna(fallback)
+    return (frame.assign(month=months, **{label: labels})
+            .groupby(["month", label], as_index=False)
+            .agg(amount=("amount", "sum"), count=("amount", "size")))
+
+
+def build_snapshot_report(snapshot):
+    """
+    Build the same report from a snapshot loaded with utils.export.read_snapshot,
+    without touching the live database.
+    """
+    return _report_from_rollups(_snapshot_rollup(snapshot["expenses"], "category", "Uncategorized"),
+                                _snapshot_rollup(snapshot["income"], "source", "Other"))
+
+
+def _report_from_rollups(expense_rollup, income_rollup):
+    # Rows with unparseable dates count toward the category totals but not the monthly charts
+    expense_months = expense_rollup[expense_rollup["month"] != "unknown"]
+    income_months = income_rollup[income_rollup["month"] != "unknown"]
+
+    category_data = expense_rollup.groupby("category")["amount"].sum().reset_index()
+    income_data = income_rollup.groupby("source")["amount"].sum().reset_index()
+    monthly_expense = expense_months.groupby("month")["amount"].sum().reset_index()
+    monthly_income = income_months.groupby("month")["amount"].sum().reset_index()
+    category_monthly_data = expense_months[["month", "category", "amount"]]
+    trend_data = pd.concat([monthly_expense.assign(Type="Expense"), monthly_income.assign(Type="Income")])
+    has_trend = not monthly_expense.empty and not monthly_income.empty
+
+    figures = {
+        "expense_pie": px.pie(
+            category_data,
+            values="amount",
+            names="category",
+            title="Expenses by Category",
+            hole=0.4
+        ) if not category_data.empty else None,
+        "income_pie": px.pie(
+            income_data,
+            values="amount",
+            names="source",
+            title="Income Breakdown by Category",
+            hole=0.4
+        ) if not income_data.empty else None,
+        # Area chart (stacked)
+        "trend_area": px.area(
+            trend_data,
+            x="month",
+            y="amount",
+            color="Type",
+            title="Monthly Expense vs Income Trend",
+            line_group="Type",
+            markers=True
+        ) if has_trend else None,
+        # Bar Chart: Monthly Spending by Category
+        "category_bar": px.bar(
+            category_monthly_data, x="month", y="amount", color="category", barmode="group",
+            title="Monthly Spending by Category"
+        ) if not category_monthly_data.empty else None,
+        # Stacked Bar Chart: Income vs Expenses
+        "stacked_bar": px.bar(
+            trend_data, x="month", y="amount", color="Type", barmode="stack",
+            title="Stacked Income vs Expenses"
+        ) if has_trend else None,
+    }
+
+    frames = {
+        "category": category_data,
+        "income_source": income_data,
+        "monthly_expense": monthly_expense,
+        "monthly_income": monthly_income,
+        "category_monthly": category_monthly_data,
+    }
+    return {"frames": frames, "figures": figures}
+
+
+def cached_report(account):
+    """The report for account's current data version if it has been built already, else None."""
+    return _report_cache.get((account.storage.key, account.dataVersion()))
+
+
+def get_report(account):
+    """
+    Return the report for account, rebuilding it only when the account's data
+    version has changed since it was last built.
+    """
+    key = (account.storage.key, account.dataVersion())
+    return _report_cache.get_or_compute(key, lambda: build_report(account))
@@ -0,0 +1,174 @@
+import calendar
+import datetime
+import re
+
+from utils.categorizer import get_categorizer
+
+FULL_MONTHS = {name.lower(): i for i, name in enumerate(calendar.month_name) if name and name != "May"}
+SHORT_MONTHS = {name.lower(): i for i, name in enumerate(calendar.month_abbr) if name}
+SHORT_MONTHS["sept"] = 9
+MONTHS = {**FULL_MONTHS, **SHORT_MONTHS}
+
+
+def _alternatives(names):
+    return "|".join(sorted(names, key=len, reverse=True))
+
+
+# Short names ('may', 'mar', 'jun') are ordinary words too, so they only count
+# as months when a year or a day number follows: 'may 2024', 'mar 5th'
+_MONTH_PATTERN = re.compile(
+    r"\b(?:(" + _alternatives(FULL_MONTHS) + r")\b(?:\s+(\d{4}))?"
+    r"|(" + _alternatives(SHORT_MONTHS) + r")\b\.?\s+(?:(\d{4})\b|\d{1,2}(?:st|nd|rd|th)?\b(?:,?\s+(\d{4})\b)?))")
+# Labels that are also everyday words only count when followed by a word
+# naming them as a category or source: 'personal expenses', 'other income'
+GENERIC_LABELS = {"other", "others", "personal", "miscellaneous", "misc", "general"}
+_LABEL_CONTEXT = r"\s+(?:category|categories|expenses?|spending|spent|costs?|income|earnings|source|sources)\b"
+_YEAR_PATTERN = re.compile(r"\b(19\d{2}|20\d{2})\b")
+_AMOUNT = r"₹?\s*(\d[\d,]*(?:\.\d+)?)"
+_MIN_AMOUNT_PATTERN = re.compile(r"(?:over|above|more than|greater than|at least|>)\s*" + _AMOUNT)
+_MAX_AMOUNT_PATTERN = re.compile(r"(?:under|below|less than|at most|<)\s*" + _AMOUNT)
+
+# First matching intent wins; passed to the model as a hint
+INTENTS = [
+    ("reduce spending", ("overspend", "too much", "cut", "reduce", "save", "saving", "budget")),
+    ("largest transactions", ("biggest", "largest", "top", "most expensive", "highest")),
+    ("comparison", ("compare", " vs", "versus", "than last", "difference")),
+    ("totals", ("how much", "total", "spent", "spend", "earn", "income")),
+]
+
+TOP_TRANSACTIONS = 5
+
+
+def _months_back(today, n):
+    month = today.month - n
+    year = today.year + (month - 1) // 12
+    return f"{year}-{(month - 1) % 12 + 1:02d}"
+
+
+def _next_month(month):
+    year, number = int(month[:4]), int(month[5:7])
+    return f"{year + number // 12}-{number % 12 + 1:02d}"
+
+
+def parse_question(question, categories=(), sources=(), today=None):
+    """
+    Pull months, categories/sources, amount bounds and intent out of a FinBot question.
+
+    Month names without a year resolve to their latest occurrence up to today.
+    Categories and sources match either their own name or a categorizer
+    keyword (e.g. 'pizza' -> Food), but only labels the user actually has.
+
+    Returns:
+        dict with 'months' (sorted 'YYYY-MM' list), 'categories', 'sources',
+        'min_amount', 'max_amount' and 'intent'
+    """
+    today = today or datetime.date.today()
+    text = question.lower()
+
+    months = set()
+    for full, full_year, short, short_year, day_year in _MONTH_PATTERN.findall(text):
+        number = MONTHS[full or short]
+        year = full_year or short_year or day_year
+        if year:
+            months.add(f"{year}-{number:02d}")
+        else:
+            months.add(f"{today.year if number <= today.month else today.year - 1}-{number:02d}")
+    if "this month" in text:
+        months.add(_months_back(today, 0))
+    if "last month" in text or "previous month" in text:
+        months.add(_months_back(today, 1))
+    if not months:
+        for year in set(_YEAR_PATTERN.findall(text)):
+            months.update(f"{year}-{m:02d}" for m in range(1, 13))
+        if "this year" in text:
+            months.update(f"{today.year}-{m:02d}" for m in range(1, today.month + 1))
+        if "last year" in text:
+            months.update(f"{today.year - 1}-{m:02d}" for m in range(1, 13))
+
+    def named(labels):
+        found = []
+        for label in labels:
+            pattern = r"\b" + re.escape(label.lower()) + r"s?\b"
+            if label.lower() in GENERIC_LABELS:
+                # 'any other tips?' is not about the Other source
+                pattern += _LABEL_CONTEXT
+            if re.search(pattern, text):
+                found.append(label)
+        return found
+
+    matched_categories, matched_sources = named(categories), named(sources)
+    categorizer = get_categorizer()
+    guessed = categorizer.guess(text)
+    # guess() falls back to the default category when no keyword matched
+    if guessed != categorizer.default:
+        if guessed in categories and guessed not in matched_categories:
+            matched_categories.append(guessed)
+        elif guessed in sources and guessed not in matched_sources:
+            matched_sources.append(guessed)
+
+    def amount(pattern):
+        match = pattern.search(text)
+        return float(match.group(1).replace(",", "")) if match else None
+
+    intent = next((name for name, words in INTENTS if any(w in text for w in words)), None)
+
+    return {
+        "months": sorted(months),
+        "categories": matched_categories,
+        "sources": matched_sources,
+        "min_amount": amount(_MIN_AMOUNT_PATTERN),
+        "max_amount": amount(_MAX_AMOUNT_PATTERN),
+        "intent": intent,
+    }
+
+
+def retrieve_context(account, question, today=None):
+    """
+    Run targeted queries for a FinBot question and render them as prompt text.
+
+    Returns:
+        the context text, or None when the question names no month, category,
+        source or amount (the caller then uses the general summary)
+    """
+    expense_labels = account.ExpenseManager.monthlyCategoryTotals()["category"].unique().tolist()
+    income_labels = account.IncomeManager.monthlySourceTotals()["source"].unique().tolist()
+    parsed = parse_question(question, expense_labels, income_labels, today)
+    if not (parsed["months"] or parsed["categories"] or parsed["sources"]
+            or parsed["min_amount"] is not None or parsed["max_amount"] is not None):
+        return None
+
+    filters = {"min_amount": parsed["min_amount"], "max_amount": parsed["max_amount"]}
+    if parsed["months"]:
+        # Only the named months, e.g. March and October but not the months between
+        filters["months"] = parsed["months"]
+    months = parsed["months"]
+    consecutive = len(months) > 3 and all(_next_month(a) == b for a, b in zip(months, months[1:]))
+    period = f"{months[0]} to {months[-1]}" if consecutive else ", ".join(months)
+
+    lines = [f"Period: {period or 'all time'}"]
+    if parsed["intent"]:
+        lines.append(f"Focus: {parsed['intent']}")
+
+    expense_filters = dict(filters, categories=parsed["categories"] or None)
+    income_filters = dict(filters, sources=parsed["sources"] or None)
+    scope = f" on {', '.join(parsed['categories'])}" if parsed["categories"] else ""
+    lines.append(f"Expenses{scope}: ₹{account.ExpenseManager.totalExpenses(**expense_filters):.2f} "
+                 f"across {account.ExpenseManager.countExpenses(**expense_filters)} transactions")
+    if parsed["sources"] or not parsed["categories"]:
+        scope = f" from {', '.join(parsed['sources'])}" if parsed["sources"] else ""
+        lines.append(f"Income{scope}: ₹{account.IncomeManager.totalIncome(**income_filters):.2f}")
+
+    if parsed["months"] and not parsed["categories"]:
+        rollup = account.ExpenseManager.monthlyCategoryTotals(parsed["months"])
+        by_category = rollup.groupby("category")["amount"].sum().sort_values(ascending=False).head(5)
+        if not by_category.empty:
+            lines.append("Spending by category:")
+            lines += [f"  - {cat}: ₹{amt:.2f}" for cat, amt in by_category.items()]
+
+    top = account.ExpenseManager.queryExpenses(sort_by="amount", descending=True, limit=TOP_TRANSACTIONS,
+                                               **expense_filters)
+    if not top.empty:
+        lines.append("Largest matching expenses:")
+        lines += [f"  - {row.date} {row.name}: ₹{row.amount:.2f} ({row.category})" for row in top.itertuples()]
+
+    return "\n".join(lines)
@@ -0,0 +1,271 @@
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+from utils.cache import LRUCache
+
+# Keywords looked for in a statement's Type/Indicator column (matched as substrings, lowercase)
+DEBIT_KEYWORDS = ['dr', 'debit', 'withdraw', 'payment']
+CREDIT_KEYWORDS = ['cr', 'credit', 'deposit']
+
+# Sign handling modes for detect_directions
+SIGN_FROM_AMOUNT = "amount"
+SIGN_FROM_TYPE = "type"
+SIGN_FROM_BOTH = "both"
+
+_CURRENCY_PATTERN = r'[,₹$€]'
+_NON_NUMERIC_PATTERN = r'[^0-9.\-]'
+
+
+def parse_amounts(values):
+    """
+    Parse a column of statement amounts into floats in one vectorized pass.
+
+    Currency symbols and thousands separators are stripped, values wrapped in
+    parentheses are treated as negative (bank style) and anything else that is
+    not a digit, '-' or '.' is dropped. Cells that cannot be parsed become NaN.
+    Columns that are already numeric are returned as floats unchanged.
+
+    Args:
+        values: pandas Series of raw amount cells
+
+    Returns:
+        float Series aligned with values
+    """
+    if pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+        return values.astype(float)
+
+    missing = values.isna()
+    s = values.astype(str).str.replace(_CURRENCY_PATTERN, '', regex=True)
+
+    parenthesized = s.str.contains('(', regex=False) & s.str.contains(')', regex=False)
+    s = s.mask(parenthesized, s.str.replace('(', '-', regex=False).str.replace(')', '', regex=False))
+
+    cleaned = s.str.replace(_NON_NUMERIC_PATTERN, '', regex=True)
+    parsed = pd.to_numeric(cleaned, errors='coerce').astype(float)
+    return parsed.mask(missing)
+
+
+def detect_types(values):
+    """
+    Classify a Type/Indicator column as 'debit', 'credit' or None per row.
+    Debit keywords win when a cell matches both lists; non-string cells are None.
+    """
+    try:
+        lowered = values.str.lower()
+    except AttributeError:
+        # .str is only available on columns holding strings
+        return pd.Series(None, index=values.index, dtype=object)
+    is_debit = lowered.str.contains('|'.join(DEBIT_KEYWORDS), regex=True, na=False).to_numpy(dtype=bool)
+    is_credit = lowered.str.contains('|'.join(CREDIT_KEYWORDS), regex=True, na=False).to_numpy(dtype=bool)
+    result = np.select([is_debit, is_credit], ['debit', 'credit'], default=None)
+    return pd.Series(result, index=values.index, dtype=object)
+
+
+def detect_directions(amounts, types=None, mode=SIGN_FROM_BOTH):
+    """
+    Decide whether each statement row is a 'debit', 'credit' or 'unknown'.
+
+    Args:
+        amounts: float Series from parse_amounts
+        types: optional raw Type/Indicator column
+        mode: SIGN_FROM_AMOUNT, SIGN_FROM_TYPE or SIGN_FROM_BOTH (type column preferred)
+
+    Returns:
+        object Series of direction labels aligned with amounts
+    """
+    from_amount = np.where(amounts.isna(), 'unknown', np.where(amounts < 0, 'debit', 'credit'))
+    from_amount = pd.Series(from_amount, index=amounts.index, dtype=object)
+
+    if mode == SIGN_FROM_AMOUNT:
+        return from_amount
+
+    from_type = detect_types(types) if types is not None else pd.Series(None, index=amounts.index, dtype=object)
+    if mode == SIGN_FROM_TYPE:
+        return from_type.fillna('unknown')
+    return from_type.fillna(from_amount)
+
+
+# Rows read up front for column selection, dtype inference and the preview
+SAMPLE_ROWS = 1000
+# Rows parsed, categorized and inserted per step of an import
+CHUNK_ROWS = 50_000
+
+
+def _is_excel(file):
+    return getattr(file, "name", str(file)).lower().endswith((".xlsx", ".xls"))
+
+
+def _excel_rows(file):
+    """Yield an Excel sheet's rows as tuples, streaming with openpyxl's read-only mode."""
+    from openpyxl import load_workbook  # optional: only needed for Excel statements
+
+    if hasattr(file, "seek"):
+        file.seek(0)
+    workbook = load_workbook(file, read_only=True, data_only=True)
+    try:
+        yield from workbook.active.iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+
+def _excel_chunks(file, chunksize, columns=None, limit=None):
+    rows = _excel_rows(file)
+    header = [str(c) if c is not None else f"Unnamed: {i}" for i, c in enumerate(next(rows, ()))]
+    positions = [header.index(c) for c in columns] if columns else range(len(header))
+    names = [header[i] for i in positions]
+    batch, seen = [], 0
+    for row in rows:
+        if limit is not None and seen >= limit:
+            break
+        batch.append([row[i] if i < len(row) else None for i in positions])
+        seen += 1
+        if len(batch) == chunksize:
+            yield pd.DataFrame(batch, columns=names)
+            batch = []
+    if batch or seen == 0:
+        yield pd.DataFrame(batch, columns=names)
+
+
+def read_sample(file, nrows=SAMPLE_ROWS):
+    """First nrows of an uploaded CSV or Excel statement, with every column (CSV cells as text)."""
+    if _is_excel(file):
+        chunks = _excel_chunks(file, nrows, limit=nrows)
+        try:
+            return next(chunks)
+        finally:
+            chunks.close()
+    if hasattr(file, "seek"):
+        file.seek(0)
+    return pd.read_csv(file, nrows=nrows, dtype=str)
+
+
+def iter_statement(file, columns, chunksize=CHUNK_ROWS):
+    """
+    Yield the statement in DataFrames of at most chunksize rows, holding only
+    the selected columns, so memory stays bounded by the chunk size rather
+    than the file size.
+
+    CSV cells are read as text, like the sample: a column that looks numeric
+    in the first rows may still hold '1,234.50' or '(45.00)' further down,
+    which parse_amounts handles but a fixed float dtype would reject.
+    """
+    columns = list(dict.fromkeys(columns))
+    if _is_excel(file):
+        # Cells arrive typed from openpyxl; parse_amounts copes with mixed columns
+        yield from _excel_chunks(file, chunksize, columns)
+        return
+    if hasattr(file, "seek"):
+        file.seek(0)
+    yield from pd.read_csv(file, usecols=columns, dtype=str, chunksize=chunksize)
+
+
+def prepare_transactions(chunk, amount_col, category_col, date_col=None, type_col=None, desc_col=None,
+                         sign_mode=SIGN_FROM_BOTH, categorizer=None):
+    """
+    Turn raw statement rows into the frame Account.importTransactions expects.
+
+    Args:
+        chunk: DataFrame of raw statement rows (a sample or one chunk)
+        desc_col: when set, category is guessed from this column by categorizer
+            instead of taken from category_col
+
+    Returns:
+        DataFrame with signed 'amount', 'direction', 'category', 'text' (the raw
+        description or category cell, for fingerprinting) and, when date_col
+        is given, 'date' columns aligned with chunk
+    """
+    amounts = parse_amounts(chunk[amount_col])
+    if desc_col is not None and categorizer is not None:
+        text = chunk[desc_col]
+        categories = categorizer.categorize(text)
+    else:
+        text = chunk[category_col]
+        categories = text.astype(str)
+    prepared = pd.DataFrame({
+        'amount': amounts,
+        'direction': detect_directions(amounts, chunk[type_col] if type_col is not None else None, sign_mode),
+        'category': categories,
+        'text': text,
+    })
+    if date_col is not None:
+        prepared['date'] = chunk[date_col]
+    return prepared
+
+
+def fingerprint_transactions(prepared, counts=None):
+    """
+    Add a 'fingerprint' column identifying each statement row across imports.
+
+    The fingerprint hashes the row's date, signed amount and normalized text
+    plus its occurrence number among identical rows, so two genuine same-day
+    purchases stay distinct while re-importing the statement reproduces both.
+    Pass the same counts dict for every chunk of one file so occurrences keep
+    counting across chunk boundaries.
+    """
+    counts = {} if counts is None else counts
+    if 'date' in prepared:
+        dates = pd.to_datetime(prepared['date'], errors='coerce', format='mixed').dt.strftime('%Y-%m-%d').fillna('')
+    else:
+        dates = pd.Series('', index=prepared.index)
+    text = (prepared['text'].astype(str).str.lower()
+            .str.replace(r'[^0-9a-z]+', ' ', regex=True).str.strip())
+    base = dates + '|' + prepared['amount'].round(2).astype(str) + '|' + text
+
+    occurrence = base.groupby(base, sort=False).cumcount() + base.map(counts).fillna(0).astype(int)
+    for key, n in base.value_counts(sort=False).items():
+        counts[key] = counts.get(key, 0) + n
+
+    keys = base + '|' + occurrence.astype(str)
+    return prepared.assign(fingerprint=[hashlib.sha1(key.encode()).hexdigest() for key in keys])
+
+
+# Parsed samples and prepared previews, shared by every session and keyed by the
+# upload's content hash, so widget changes on the categorizer page skip re-parsing.
+# Cached frames are shared: callers must treat them as read-only.
+_digests = LRUCache(maxsize=64)
+_samples = LRUCache(maxsize=8)
+_previews = LRUCache(maxsize=32)
+
+
+def file_digest(file):
+    """SHA-256 of an uploaded file's content, remembered per Streamlit upload id."""
+    upload_id = getattr(file, "file_id", None)
+    if upload_id is not None:
+        digest = _digests.get(upload_id)
+        if digest is not None:
+            return digest
+    if hasattr(file, "getbuffer"):
+        with file.getbuffer() as view:
+            digest = hashlib.sha256(view).hexdigest()
+    else:
+        file.seek(0)
+        digest = hashlib.sha256(file.read()).hexdigest()
+    if upload_id is not None:
+        _digests.put(upload_id, digest)
+    return digest
+
+
+def cached_sample(file, nrows=SAMPLE_ROWS):
+    """
+    read_sample through a cache keyed by content hash.
+
+    Returns:
+        (digest, sample DataFrame)
+    """
+    digest = file_digest(file)
+    sample = _samples.get_or_compute((digest, _is_excel(file), nrows), lambda: read_sample(file, nrows))
+    return digest, sample
+
+
+def cached_preview(digest, sample, amount_col, category_col, date_col=None, type_col=None, desc_col=None,
+                   sign_mode=SIGN_FROM_BOTH, categorizer=None):
+    """
+    prepare_transactions and fingerprint_transactions on a cached sample,
+    keyed by its digest and the column mapping.
+    """
+    key = (digest, len(sample), amount_col, category_col, date_col, type_col, desc_col, sign_mode,
+           categorizer.key if categorizer is not None and desc_col is not None else None)
+    return _previews.get_or_compute(key, lambda: fingerprint_transactions(prepare_transactions(
+        sample, amount_col, category_col, date_col, type_col, desc_col, sign_mode, categorizer)))
@@ -0,0 +1,208 @@
+import argparse
+import glob
+import os
+import sqlite3
+
+from utils.database import get_database
+from utils.migrations import LEDGER_MIGRATIONS, TENANT_MIGRATIONS
+
+# 'file' keeps one SQLite file per user (f"{email}.db") plus users.db;
+# 'shared' keeps every user's ledger and the users table in one database.
+STORAGE_MODE = os.environ.get("FINTRACK_STORAGE", "file")
+SHARED_DB = os.environ.get("FINTRACK_DB", "fintrack.db")
+USERS_DB = "users.db"
+
+USERS_SCHEMA = '''CREATE TABLE IF NOT EXISTS users (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    email TEXT UNIQUE,
+                    password TEXT)'''
+
+
+class Storage:
+    """
+    Where one user's ledger lives and how SQL is scoped to it.
+
+    ExpenseManager, IncomeManager and Account build their statements through
+    scope(), ledger_where(), insert_sql() and tag(), so the same code runs
+    against a per-user file or the shared multi-tenant database.
+    """
+
+    tenant_column = None
+
+    def __init__(self, db, user_id=None):
+        self.db = db
+        self.user_id = user_id
+
+    @property
+    def key(self):
+        """Identifies this ledger within the process, e.g. for caches."""
+        return (self.db.db_name, self.user_id)
+
+    def scope(self):
+        """(conditions, params) restricting expenses, income and rollup queries to this ledger."""
+        return [], []
+
+    def ledger_key(self):
+        """(column, value) of this ledger's row in the balance and data_version tables."""
+        return "id", 1
+
+    def ledger_where(self):
+        column, value = self.ledger_key()
+        return f" WHERE {column} = ?", [value]
+
+    def insert_sql(self, table, columns, or_ignore=False):
+        columns = ([self.tenant_column] if self.tenant_column else []) + list(columns)
+        verb = "INSERT OR IGNORE" if or_ignore else "INSERT"
+        return f"{verb} INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+
+    def insert_select_sql(self, table, columns, expressions, source, or_ignore=False):
+        """
+        INSERT ... SELECT filling columns of table from expressions over source
+        (a table name plus any WHERE clause); its parameters are tag(()).
+        """
+        columns = ([self.tenant_column] if self.tenant_column else []) + list(columns)
+        expressions = (["?"] if self.tenant_column else []) + list(expressions)
+        verb = "INSERT OR IGNORE" if or_ignore else "INSERT"
+        return f"{verb} INTO {table} ({', '.join(columns)}) SELECT {', '.join(expressions)} FROM {source}"
+
+    def tag(self, row):
+        """Parameters for insert_sql from one row of column values."""
+        return tuple(row)
+
+    def tag_rows(self, rows):
+        return rows
+
+
+class FileStorage(Storage):
+    """A ledger in its own SQLite file (the original one-file-per-user layout)."""
+
+    def __init__(self, db_name):
+        super().__init__(get_database(db_name))
+        # Create or upgrade the schema in place (once per process)
+        self.db.migrate(LEDGER_MIGRATIONS)
+
+
+class SharedStorage(Storage):
+    """
+    One user's ledger inside the consolidated database, where every table
+    carries a user_id column and the indexes lead with it.
+    """
+
+    tenant_column = "user_id"
+
+    def __init__(self, user_id, db_name=None):
+        super().__init__(get_database(db_name or SHARED_DB), user_id)
+        # Many sessions share this file; WAL lets them read while one writes
+        self.db.enable_wal()
+        self.db.migrate(TENANT_MIGRATIONS)
+
+    def scope(self):
+        return ["user_id = ?"], [self.user_id]
+
+    def ledger_key(self):
+        return "user_id", self.user_id
+
+    def tag(self, row):
+        return (self.user_id, *row)
+
+    def tag_rows(self, rows):
+        return [(self.user_id, *row) for row in rows]
+
+
+def as_storage(storage):
+    """Accept a Storage or, as before, the path of a per-user database file."""
+    return storage if isinstance(storage, Storage) else FileStorage(storage)
+
+
+def user_storage(user_email):
+    """The storage for a logged-in user under the configured FINTRACK_STORAGE mode."""
+    if STORAGE_MODE == "shared":
+        return SharedStorage(user_email)
+    return FileStorage(f"{user_email}.db")
+
+
+def users_db_name():
+    """Database holding the users table under the configured storage mode."""
+    return SHARED_DB if STORAGE_MODE == "shared" else USERS_DB
+
+
+def _table_exists(conn, table):
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)).fetchone() is not None
+
+
+def _has_column(conn, table, column):
+    return any(row[1] == column for row in conn.execute(f"PRAGMA table_info({table})"))
+
+
+def merge_user_files(source_dir=".", target=None, replace=False):
+    """
+    Copy every per-user '<email>.db' ledger in source_dir, and the accounts in
+    its users.db, into the consolidated database.
+
+    A user who already has rows in the target is skipped unless replace is set,
+    in which case their rows there are deleted first, so the merge can be re-run.
+    Row ids are reassigned by the target database.
+
+    Returns:
+        dict of {user_email: {'expenses': n, 'income': n} or 'skipped'}
+    """
+    target = target or SHARED_DB
+    db = get_database(target)
+    db.enable_wal()
+    db.migrate(TENANT_MIGRATIONS)
+    db.ensure_schema("users", USERS_SCHEMA)
+
+    results = {}
+    for path in sorted(glob.glob(os.path.join(source_dir, "*@*.db"))):
+        if os.path.abspath(path) == os.path.abspath(target):
+            continue
+        user_id = os.path.basename(path)[:-len(".db")]
+        source = sqlite3.connect(path)
+        try:
+            # date(date) normalizes older 'YYYY-MM-DD HH:MM:SS' values as migration 3 does
+            rows = {table: source.execute(f'''SELECT COALESCE(date(date), date), name, amount, {label}, description,
+                                                     {"fingerprint" if _has_column(source, table, "fingerprint") else "NULL"}
+                                              FROM {table} ORDER BY id''').fetchall()
+                    if _table_exists(source, table) else []
+                    for table, label in (("expenses", "category"), ("income", "source"))}
+        finally:
+            source.close()
+
+        with db.transaction():
+            existing = db.conn.execute("SELECT (SELECT COUNT(*) FROM expenses WHERE user_id = ?) + "
+                                       "(SELECT COUNT(*) FROM income WHERE user_id = ?)", (user_id, user_id)).fetchone()[0]
+            if existing and not replace:
+                results[user_id] = "skipped"
+                continue
+            db.conn.execute("DELETE FROM expenses WHERE user_id = ?", (user_id,))
+            db.conn.execute("DELETE FROM income WHERE user_id = ?", (user_id,))
+            for table, label in (("expenses", "category"), ("income", "source")):
+                db.conn.executemany(f'''INSERT INTO {table} (user_id, date, name, amount, {label}, description, fingerprint)
+                                        VALUES (?, ?, ?, ?, ?, ?, ?)''', [(user_id, *row) for row in rows[table]])
+        results[user_id] = {"expenses": len(rows["expenses"]), "income": len(rows["income"])}
+
+    users_path = os.path.join(source_dir, USERS_DB)
+    if os.path.exists(users_path) and os.path.abspath(users_path) != os.path.abspath(target):
+        source = sqlite3.connect(users_path)
+        try:
+            users = source.execute("SELECT email, password FROM users").fetchall() if _table_exists(source, "users") else []
+        finally:
+            source.close()
+        with db.transaction():
+            db.conn.executemany("INSERT OR IGNORE INTO users (email, password) VALUES (?, ?)", users)
+
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Merge per-user FinTrack databases into one multi-tenant database.")
+    parser.add_argument("--source", default=".", help="directory holding users.db and the <email>.db files")
+    parser.add_argument("--target", default=SHARED_DB, help="consolidated database to create or extend")
+    parser.add_argument("--replace", action="store_true", help="overwrite users already present in the target")
+    args = parser.parse_args()
+
+    for user, result in merge_user_files(args.source, args.target, args.replace).items():
+        if result == "skipped":
+            print(f"{user}: already in {args.target}, skipped (use --replace to overwrite)")
+        else:
+            print(f"{user}: {result['expenses']} expenses, {result['income']} income rows")